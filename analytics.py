@@ -0,0 +1,102 @@
+import datetime
+
+from models import Event, SalesRollup, SalesSummary
+
+# Konfigurasi Analitik
+ANALYTICS_CONFIG = {
+    'hour_buckets': 48,         # panjang grafik per jam (jumlah bucket)
+    'day_buckets': 30,          # panjang grafik per hari
+    'max_buckets': 366,
+    'velocity_hours': 24,       # kecepatan penjualan = tiket terjual dalam sekian jam terakhir / jam
+}
+
+
+def _bucket_range(granularity, count, now):
+    """Start of the last `count` buckets up to and including the current one, oldest first"""
+    step = datetime.timedelta(hours=1) if granularity == 'hour' else datetime.timedelta(days=1)
+    current = SalesRollup.bucket(now, granularity)
+    return [current - step * i for i in range(count - 1, -1, -1)]
+
+
+def _velocity(tickets, stok):
+    hours = ANALYTICS_CONFIG['velocity_hours']
+    per_hour = tickets / hours
+    return {
+        'tiket_per_jam': round(per_hour, 2),
+        # Perkiraan kasar: kecepatan saat ini dianggap tetap
+        'habis_dalam_jam': round(stok / per_hour, 1) if per_hour and stok else None,
+    }
+
+
+def _sell_through(sold, stok):
+    return round(sold / (sold + stok), 4) if sold + stok else None
+
+
+def event_report(event_id, granularity='hour', buckets=None, now=None):
+    """Chart-ready sales of one event: zero-filled series plus sell-through and velocity; None if unknown"""
+    event = Event.get_by_id(event_id)
+    if event is None:
+        return None
+    now = now or datetime.datetime.now()
+    count = max(1, min(buckets or ANALYTICS_CONFIG[f'{granularity}_buckets'], ANALYTICS_CONFIG['max_buckets']))
+    labels = _bucket_range(granularity, count, now)
+    rows = {row['bucket_start']: row for row in SalesRollup.get_series(event_id, granularity, labels[0])}
+
+    velocity_since = SalesRollup.bucket(now, 'hour') - datetime.timedelta(hours=ANALYTICS_CONFIG['velocity_hours'] - 1)
+    if granularity == 'hour' and velocity_since >= labels[0]:
+        recent = sum(row['total_tiket'] for start, row in rows.items() if start >= velocity_since)
+    else:
+        recent = sum(row['total_tiket'] for row in SalesRollup.get_series(event_id, 'hour', velocity_since))
+
+    summary = SalesSummary.get(event_id) or {'total_tiket': 0, 'total_penjualan': 0}
+    sold = int(summary['total_tiket'] or 0)
+    report = {
+        'event_id': event.id,
+        'nama_event': event.nama_event,
+        'granularity': granularity,
+        'labels': [start.isoformat() for start in labels],
+        'tiket': [int(rows[start]['total_tiket']) if start in rows else 0 for start in labels],
+        'penjualan': [float(rows[start]['total_penjualan']) if start in rows else 0.0 for start in labels],
+        'transaksi': [int(rows[start]['jumlah_transaksi']) if start in rows else 0 for start in labels],
+        'total_tiket': sold,
+        'total_penjualan': float(summary['total_penjualan'] or 0),
+        'stok': event.stok,
+        'sell_through': _sell_through(sold, event.stok),
+    }
+    report.update(_velocity(recent, event.stok))
+    return report
+
+
+def overview(now=None):
+    """Sell-through and velocity of every event, fastest selling first"""
+    now = now or datetime.datetime.now()
+    since = SalesRollup.bucket(now, 'hour') - datetime.timedelta(hours=ANALYTICS_CONFIG['velocity_hours'] - 1)
+    recent = SalesRollup.get_recent_tickets(since)
+    sales = SalesSummary.get_by_event()
+    rows = []
+    for event in Event.get_all(projection='row'):
+        sold = int(sales[event.id]['total_tiket']) if event.id in sales else 0
+        row = {'event_id': event.id, 'nama_event': event.nama_event, 'total_tiket': sold, 'stok': event.stok,
+               'sell_through': _sell_through(sold, event.stok)}
+        row.update(_velocity(recent.get(event.id, 0), event.stok))
+        rows.append(row)
+    rows.sort(key=lambda row: (-row['tiket_per_jam'], row['event_id']))
+    return rows
+
+
+def init_app(app):
+    """Read ANALYTICS_HOUR_BUCKETS, ... from app.config and register `flask analytics backfill`"""
+    for key in ANALYTICS_CONFIG:
+        config_key = f'ANALYTICS_{key.upper()}'
+        if config_key in app.config:
+            ANALYTICS_CONFIG[key] = app.config[config_key]
+
+    @app.cli.group('analytics')
+    def analytics_cli():
+        """Per-event sales rollups."""
+
+    @analytics_cli.command('backfill')
+    def backfill_command():
+        """Rebuild the hourly/daily rollups from the transactions table."""
+        count = SalesRollup.rebuild()
+        print(f'{count} bucket penjualan dibangun ulang.')
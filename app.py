@@ -1,11 +1,53 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, Response, stream_with_context
 from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
 import os
-from models import User, Event, Transaction
+import datetime
+import click
+import db
+import cache
+import waiting_room
+import reservations
+import metrics
+import images
+import assets
+import pagecache
+import auth
+import sessions
+import bulk
+import migrate
+import mailer
+import jobs
+import tasks
+import idempotency
+import live_stock
+import analytics
+import search
+from models import User, Event, Transaction, PurchaseResult, SalesSummary, SalesRollup
 
 app = Flask(__name__)
 app.secret_key = 'kunci_rahasia_ujian_anda' # Ganti dengan yang unik
+app.config.from_prefixed_env()  # mis. FLASK_WAITING_ROOM_ENABLED=true
+db.init_app(app)  # Satu koneksi pool per request
+metrics.init_app(app)  # /metrics (Prometheus) + header Server-Timing saat debug
+cache.init_app(app)
+search.init_app(app)  # index pencarian dibangun ulang paling lambat tiap SEARCH_MAX_AGE detik
+waiting_room.init_app(app)
+reservations.init_app(app)
+images.init_app(app)
+assets.init_app(app)  # URL statis ber-hash + Cache-Control immutable
+pagecache.init_app(app)
+auth.init_app(app)  # worker pool hash password + pembatasan percobaan login
+sessions.init_app(app, user_loader=User.get_by_id)  # session di server, bisa dicabut
+migrate.init_app(app)  # flask db upgrade / status / check
+mailer.init_app(app)
+jobs.init_app(app)  # antrean job di latar belakang (email konfirmasi, dll.)
+idempotency.init_app(app)  # submit checkout ganda tidak membuat pesanan ganda
+live_stock.init_app(app)  # /api/stok + stream SSE dari satu poller bersama
+analytics.init_app(app)  # rollup penjualan per jam/hari + flask analytics backfill
+
+EVENTS_PER_PAGE = 12
+TRANSACTIONS_PER_PAGE = 20
 
 # DECORATORS (Untuk Otorisasi/Role)
 def login_required(f):
@@ -26,6 +68,19 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def admission_required(f):
+    """Lewat ruang tunggu dulu jika antrean aktif untuk event ini"""
+    @wraps(f)
+    def decorated_function(event_id, *args, **kwargs):
+        room = waiting_room.room
+        if room.is_active(event_id):
+            token = session.get('admission', {}).get(str(event_id))
+            if not room.check_token(token, event_id, session['user_id']):
+                flash('Event ini sedang ramai. Silakan tunggu giliran Anda.', 'info')
+                return redirect(url_for('antrean', event_id=event_id))
+        return f(event_id, *args, **kwargs)
+    return decorated_function
+
 # --- ROUTES AUTENTIKASI ---
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -35,7 +90,12 @@ def register():
         password = request.form['password']
 
         # Create user using the User model
-        if User.create(nama, email, password):
+        try:
+            created = User.create(nama, email, password)
+        except auth.HasherBusy:
+            flash('Server sedang sibuk. Silakan coba beberapa saat lagi.', 'warning')
+            return render_template('auth/register.html'), 503
+        if created:
             flash('Registrasi berhasil! Silakan login.', 'success')
             return redirect(url_for('login'))
         else:
@@ -49,12 +109,21 @@ def login():
         password = request.form['password']
 
         # Authenticate user using the User model
-        user = User.authenticate(email, password)
+        try:
+            auth.check_login_allowed(request.remote_addr, email)
+            user = User.authenticate(email, password)
+        except auth.LoginThrottled as e:
+            flash(f'Terlalu banyak percobaan login. Coba lagi dalam {e.retry_after} detik.', 'danger')
+            response = app.make_response((render_template('auth/login.html'), 429))
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+        except auth.HasherBusy:
+            flash('Server sedang sibuk. Silakan coba login beberapa saat lagi.', 'warning')
+            return render_template('auth/login.html'), 503
+        auth.record_login_result(email, user is not None)
 
         if user:
-            session['user_id'] = user.id
-            session['nama'] = user.nama_lengkap
-            session['role'] = user.role
+            sessions.login(user)  # id session baru + salinan nama/role
             flash(f"Selamat datang, {user.nama_lengkap}!", 'success') # Alert Login Berhasil
 
             if user.role == 'admin':
@@ -68,20 +137,31 @@ def login():
 @app.route('/logout')
 def logout():
     session.clear()
+    sessions.regenerate()
     flash('Anda telah logout.', 'info')
     return redirect(url_for('login'))
 
 # --- ROUTES UTAMA ---
 @app.route('/')
+@pagecache.cached_page('catalogue_ttl')
 def index():
     search_query = request.args.get('search', '')
+    upcoming = request.args.get('upcoming') == '1'
+    page = None
     if search_query:
         events = Event.search_by_nama_event(search_query)
     else:
-        events = Event.get_all()
-    return render_template('index.html', events=events, search_query=search_query)
+        page = Event.get_page(
+            limit=EVENTS_PER_PAGE,
+            after=request.args.get('after'),
+            before=request.args.get('before'),
+            upcoming_only=upcoming
+        )
+        events = page.events
+    return render_template('index.html', events=events, search_query=search_query, page=page, upcoming=upcoming)
 
 @app.route('/event/<int:event_id>')
+@pagecache.cached_page('event_ttl', namespaces=('events', 'event:{event_id}'))
 def event_detail(event_id):
     event = Event.get_by_id(event_id)
     if not event:
@@ -94,11 +174,31 @@ def event_detail(event_id):
 @login_required
 @admin_required
 def admin_dashboard():
-    events = Event.get_all()
-    transaksi = Transaction.get_all_with_details()
-    total_penjualan = Transaction.get_total_penjualan()
-    total_tiket = Transaction.get_total_tiket_sold()
-    return render_template('admin/dashboard.html', events=events, transaksi=transaksi, total_penjualan=total_penjualan, total_tiket=total_tiket)
+    events = Event.get_all(projection='row')  # tabel admin tidak menampilkan deskripsi
+    penjualan_per_event = SalesSummary.get_by_event()
+    totals = SalesSummary.get_totals()
+
+    # Filter & paginasi transaksi
+    trx_event = request.args.get('trx_event', type=int)
+    trx_from = _parse_date(request.args.get('trx_from'))
+    trx_to = _parse_date(request.args.get('trx_to'))
+    transaksi, trx_next = Transaction.get_page(
+        limit=TRANSACTIONS_PER_PAGE,
+        before_id=request.args.get('trx_before', type=int),
+        event_id=trx_event,
+        date_from=trx_from,
+        date_to=trx_to
+    )
+    trx_filter = {'trx_event': trx_event, 'trx_from': trx_from, 'trx_to': trx_to}
+    return render_template('admin/dashboard.html', events=events, transaksi=transaksi,
+                           total_penjualan=totals['total_penjualan'], total_tiket=totals['total_tiket'],
+                           penjualan_per_event=penjualan_per_event, trx_next=trx_next, trx_filter=trx_filter)
+
+def _parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
 
 @app.route('/admin/tambah_event', methods=['GET', 'POST'])
 @login_required
@@ -114,6 +214,7 @@ def tambah_event():
         gambar = request.form.get('gambar', '')  # Optional field
 
         if Event.create(nama, tanggal, lokasi, harga, stok, deskripsi, gambar):
+            tasks.process_poster_later(gambar)  # varian poster (card/detail, JPEG + WebP) dibuat di background
             flash('Event berhasil ditambahkan!', 'success')
         else:
             flash('Terjadi kesalahan saat menambahkan event.', 'danger')
@@ -135,12 +236,13 @@ def edit_event(event_id):
         gambar = request.form.get('gambar', '')
 
         if Event.update(event_id, nama, tanggal, lokasi, harga, stok, deskripsi, gambar):
+            tasks.process_poster_later(gambar)
             flash('Event berhasil diperbarui!', 'success')
         else:
             flash('Terjadi kesalahan saat memperbarui event.', 'danger')
         return redirect(url_for('admin_dashboard'))
 
-    event = Event.get_by_id(event_id)
+    event = Event.get_by_id(event_id, use_cache=False)
     if not event:
         flash('Event tidak ditemukan.', 'danger')
         return redirect(url_for('admin_dashboard'))
@@ -156,9 +258,52 @@ def hapus_event(event_id):
         flash('Terjadi kesalahan saat menghapus event.', 'danger')
     return redirect(url_for('admin_dashboard'))
 
+@app.route('/admin/import_event', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def import_event():
+    report = None
+    if request.method == 'POST':
+        file = request.files.get('file')
+        fmt = _file_format(file.filename if file else '')
+        if fmt is None:
+            flash('Pilih file .csv atau .json.', 'danger')
+        else:
+            report = bulk.import_events(file.stream, fmt)
+            flash(f'{report.inserted} event berhasil diimpor, {report.failed} baris gagal.',
+                  'success' if not report.failed else 'warning')
+    return render_template('admin/import_event.html', report=report)
+
+@app.route('/admin/export/<string:what>.<string:fmt>')
+@login_required
+@admin_required
+def export_data(what, fmt):
+    if what not in ('events', 'transactions') or fmt not in ('csv', 'json'):
+        flash('Format ekspor tidak dikenal.', 'danger')
+        return redirect(url_for('admin_dashboard'))
+    if what == 'events':
+        chunks = bulk.export_events(fmt)
+        filename = f'festix-events-{datetime.date.today()}.{fmt}'
+    else:
+        # Laporan keuangan: filter sama dengan tabel transaksi di dashboard
+        trx_from = _parse_date(request.args.get('trx_from'))
+        trx_to = _parse_date(request.args.get('trx_to'))
+        chunks = bulk.export_transactions(fmt, request.args.get('trx_event', type=int), trx_from, trx_to)
+        filename = f'festix-transactions-{trx_from or "awal"}-{trx_to or datetime.date.today()}.{fmt}'
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/json'
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['X-Accel-Buffering'] = 'no'  # jangan ditahan reverse proxy; unduhan langsung mulai
+    return response
+
+def _file_format(filename):
+    ext = os.path.splitext(filename or '')[1].lower()
+    return {'.csv': 'csv', '.json': 'json', '.jsonl': 'json', '.ndjson': 'json'}.get(ext)
+
 # ROUTES MEMBER (TRANSAKSI)
 @app.route('/beli/<int:event_id>', methods=['POST'])
 @login_required
+@admission_required
 def beli_tiket(event_id):
     if session['role'] == 'admin':
         flash('Admin tidak bisa beli tiket!', 'warning')
@@ -166,57 +311,172 @@ def beli_tiket(event_id):
 
     jumlah = int(request.form['jumlah'])
 
-    # Get event details
+    # Tahan tiket selama checkout; stok langsung berkurang dan kembali jika hold kedaluwarsa
+    status, hold = reservations.place_hold(session['user_id'], event_id, jumlah)
     event = Event.get_by_id(event_id)
 
-    if event and event.stok >= jumlah:
+    if status == PurchaseResult.SUCCESS and event:
         total_bayar = event.harga * jumlah
         # Redirect to checkout page with event details and purchase info
-        return render_template('member/checkout.html', event=event, jumlah_tiket=jumlah, total_harga=total_bayar)
-    else:
-        flash('Stok tiket tidak mencukupi.', 'danger')
+        return render_template('member/checkout.html', event=event, jumlah_tiket=jumlah, total_harga=total_bayar, hold=hold,
+                               checkout_token=idempotency.new_token())
+    elif status == PurchaseResult.NOT_FOUND or not event:
+        flash('Event tidak ditemukan.', 'danger')
         return redirect(url_for('index'))
+    elif status == PurchaseResult.SOLD_OUT:
+        flash('Stok tiket tidak mencukupi.', 'danger')
+    else:
+        flash('Terjadi kesalahan saat memesan tiket.', 'danger')
+    return redirect(url_for('index'))
 
 @app.route('/proses_checkout/<int:event_id>', methods=['GET', 'POST'])
 @login_required
+@admission_required
 def proses_checkout(event_id):
     if session['role'] == 'admin':
         flash('Admin tidak bisa beli tiket!', 'warning')
         return redirect(url_for('index'))
 
+    # If GET request, redirect to index
+    if request.method != 'POST':
+        return redirect(url_for('index'))
+
+    jumlah = int(request.form['jumlah_tiket'])
+    nama_pemesan = request.form['nama_pemesan']
+    email_pemesan = request.form['email_pemesan']
+    no_telepon = request.form['no_telepon']
+    catatan = request.form.get('catatan', '')
+    hold_id = request.form.get('hold_id', type=int)
+    token = request.form.get('checkout_token', '')
+    if not token:
+        flash('Form checkout tidak valid. Silakan ulangi pemesanan.', 'danger')
+        return redirect(url_for('event_detail', event_id=event_id))
+
+    # Token sekali pakai dari checkout.html: klik ganda / refresh POST mendapat hasil submit pertama
+    key = f"checkout:{session['user_id']}:{event_id}:{token}"
+    recorded = idempotency.claim(key)
+    if recorded == idempotency.PENDING:
+        flash('Pesanan Anda masih diproses. Cek kembali di Tiket Saya.', 'info')
+        return redirect(url_for('tiket_saya'))
+    if recorded is not None:
+        result = PurchaseResult(recorded['status'], recorded['transaction_id'])
+    else:
+        # Hold diubah menjadi transaksi (atau stok dikurangi) dalam satu transaksi DB
+        result = Transaction.purchase(session['user_id'], event_id, jumlah, nama_pemesan, email_pemesan, no_telepon, catatan, hold_id=hold_id)
+        if result.status == PurchaseResult.ERROR:
+            idempotency.release(key)  # transaksi di-rollback, submit ulang boleh mencoba lagi
+        else:
+            idempotency.finish(key, {'status': result.status, 'transaction_id': result.transaction_id})
+            if result.ok:
+                # Email & pekerjaan lain setelah pembelian berjalan di worker, redirect tidak menunggu
+                try:
+                    tasks.after_purchase(result.transaction_id)
+                except Exception as e:
+                    # Pembelian sudah ter-commit: jangan sampai pembeli melihat error lalu membeli lagi
+                    print(f"Error queueing post-purchase jobs for transaction {result.transaction_id}: {e}")
+    if result.ok:
+        flash('Pembelian Berhasil!', 'success')
+        return redirect(url_for('tiket_saya'))
+
+    event = Event.get_by_id(event_id)
+    if result.status == PurchaseResult.NOT_FOUND or not event:
+        flash('Event tidak ditemukan.', 'danger')
+        return redirect(url_for('index'))
+    elif result.status == PurchaseResult.SOLD_OUT:
+        flash('Stok tiket tidak mencukupi.', 'danger')
+    else:
+        flash('Terjadi kesalahan saat membuat transaksi.', 'danger')
+
+    total_bayar = event.harga * jumlah
+    return render_template('member/checkout.html', event=event, jumlah_tiket=jumlah, total_harga=total_bayar,
+                           checkout_token=idempotency.new_token())
+
+# ROUTES RUANG TUNGGU (ANTREAN)
+@app.route('/antrean/<int:event_id>')
+@login_required
+def antrean(event_id):
+    room = waiting_room.room
+    if not room.is_active(event_id):
+        return redirect(url_for('event_detail', event_id=event_id))
+    info = room.join(event_id, session['user_id'])
+    if info['token']:
+        _simpan_token_antrean(event_id, info['token'])
+        flash('Giliran Anda! Silakan lanjutkan pembelian.', 'success')
+        return redirect(url_for('event_detail', event_id=event_id))
     event = Event.get_by_id(event_id)
     if not event:
         flash('Event tidak ditemukan.', 'danger')
         return redirect(url_for('index'))
+    return render_template('member/antrean.html', event=event, info=info)
 
-    if request.method == 'POST':
-        jumlah = int(request.form['jumlah_tiket'])
-
-        if event.stok >= jumlah:
-            total_bayar = event.harga * jumlah
-            nama_pemesan = request.form['nama_pemesan']
-            email_pemesan = request.form['email_pemesan']
-            no_telepon = request.form['no_telepon']
-            catatan = request.form.get('catatan', '')
-
-            # Update event stock
-            new_stok = event.stok - jumlah
-            if Event.update(event.id, event.nama_event, event.tanggal, event.lokasi, event.harga, new_stok, event.deskripsi, event.gambar):
-                # Create transaction with additional order details
-                if Transaction.create_with_details(session['user_id'], event_id, jumlah, total_bayar, nama_pemesan, email_pemesan, no_telepon, catatan):
-                    flash('Pembelian Berhasil!', 'success')
-                    return redirect(url_for('tiket_saya'))
-                else:
-                    flash('Terjadi kesalahan saat membuat transaksi.', 'danger')
-            else:
-                flash('Terjadi kesalahan saat memperbarui stok.', 'danger')
-        else:
-            flash('Stok tiket tidak mencukupi.', 'danger')
+@app.route('/antrean/<int:event_id>/status')
+@login_required
+def antrean_status(event_id):
+    room = waiting_room.room
+    info = room.status(event_id, session['user_id']) if room.is_active(event_id) else None
+    if info is None:
+        return jsonify({'admitted': not room.is_active(event_id), 'position': None})
+    if info['token']:
+        _simpan_token_antrean(event_id, info['token'])
+    return jsonify({'admitted': bool(info['token']), 'position': info['position'], 'eta': info['eta'],
+                    'redirect': url_for('event_detail', event_id=event_id)})
+
+def _simpan_token_antrean(event_id, token):
+    tokens = dict(session.get('admission', {}))
+    tokens[str(event_id)] = token
+    session['admission'] = tokens
+
+@app.route('/admin/antrean/<int:event_id>')
+@login_required
+@admin_required
+def antrean_stats(event_id):
+    return jsonify(waiting_room.room.stats(event_id))
 
-        return render_template('member/checkout.html', event=event, jumlah_tiket=jumlah, total_harga=total_bayar)
+@app.route('/admin/analytics')
+@login_required
+@admin_required
+def analytics_overview():
+    """Sell-through and sales velocity of every event"""
+    return jsonify(analytics.overview())
 
-    # If GET request, redirect to index
-    return redirect(url_for('index'))
+@app.route('/admin/analytics/<int:event_id>')
+@login_required
+@admin_required
+def analytics_event(event_id):
+    """Chart-ready hourly (?granularity=hour) or daily (?granularity=day) sales of one event"""
+    granularity = request.args.get('granularity', 'hour')
+    if granularity not in SalesRollup.GRANULARITIES:
+        return jsonify({'error': "granularity harus 'hour' atau 'day'"}), 400
+    report = analytics.event_report(event_id, granularity, request.args.get('buckets', type=int))
+    if report is None:
+        return jsonify({'error': 'Event tidak ditemukan'}), 404
+    return jsonify(report)
+
+# ROUTES STOK LIVE
+@app.route('/api/stok')
+def api_stok():
+    """Current stock for ?ids=1,2,3 in one query (or from the poller's last tick)"""
+    try:
+        event_ids = live_stock.parse_ids(request.args.get('ids'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = jsonify({str(event_id): stok for event_id, stok in live_stock.current(event_ids).items()})
+    response.headers['Cache-Control'] = 'public, max-age=1'
+    return response
+
+@app.route('/api/stok/stream')
+def api_stok_stream():
+    """Server-sent events with the stock of ?ids=1,2,3 whenever it changes"""
+    try:
+        event_ids = live_stock.parse_ids(request.args.get('ids'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not event_ids:
+        return jsonify({'error': 'ids wajib diisi'}), 400
+    initial = live_stock.current(event_ids)
+    # Generator tidak memakai DB atau session, jadi tidak perlu stream_with_context
+    return Response(live_stock.stream(event_ids, initial), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/tiket_saya')
 @login_required
@@ -224,5 +484,48 @@ def tiket_saya():
     tiket = Transaction.get_by_user_id(session['user_id'])
     return render_template('member/tiket_saya.html', tiket=tiket)
 
+# CLI
+@app.cli.command('rebuild-sales-summary')
+def rebuild_sales_summary():
+    """Recompute sales_summary from the transactions table."""
+    if SalesSummary.rebuild():
+        print('sales_summary berhasil dibangun ulang.')
+    else:
+        print('Gagal membangun ulang sales_summary.')
+
+@app.cli.command('import-events')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=bulk.BATCH_SIZE, show_default=True)
+def import_events_command(path, batch_size):
+    """Bulk import events from a CSV or JSON file."""
+    fmt = _file_format(path)
+    if fmt is None:
+        print('File harus .csv, .json, .jsonl atau .ndjson.')
+        return
+    with open(path, 'rb') as f:
+        report = bulk.import_events(f, fmt, batch_size)
+    for row_number, message in report.errors:
+        print(f'Baris {row_number}: {message}')
+    if report.truncated:
+        print(f'... dan {report.failed - len(report.errors)} error lainnya.')
+    print(f'{report.inserted} event diimpor, {report.failed} baris gagal.')
+
+@app.cli.command('export')
+@click.argument('what', type=click.Choice(['events', 'transactions']))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'json']), default='csv', show_default=True)
+@click.option('--output', type=click.File('w'), default='-', help='file tujuan (default: stdout)')
+@click.option('--event', 'event_id', type=int, help='transaksi: hanya event ini')
+@click.option('--from', 'date_from', type=click.DateTime(['%Y-%m-%d']), help='transaksi: mulai tanggal (inklusif)')
+@click.option('--to', 'date_to', type=click.DateTime(['%Y-%m-%d']), help='transaksi: sampai tanggal (inklusif)')
+def export_command(what, fmt, output, event_id, date_from, date_to):
+    """Stream events or transactions to CSV/JSON."""
+    if what == 'events':
+        chunks = bulk.export_events(fmt)
+    else:
+        chunks = bulk.export_transactions(fmt, event_id, date_from and date_from.date(), date_to and date_to.date())
+    for chunk in chunks:
+        output.write(chunk)
+
 if __name__ == '__main__':
+    migrate.require_current()  # langsung berhenti jika skema belum di-upgrade
     app.run(debug=True)
\ No newline at end of file
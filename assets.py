@@ -0,0 +1,180 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+from flask import current_app, request, send_from_directory, url_for as flask_url_for
+
+try:
+    import brotli
+except ImportError:  # brotli opsional: tanpa modul ini hanya salinan gzip yang dibuat
+    brotli = None
+
+# Konfigurasi Asset Statis
+ASSETS_CONFIG = {
+    'immutable_max_age': 31536000,   # URL ber-hash tidak pernah berubah isinya: cache 1 tahun
+    'default_max_age': 3600,         # URL tanpa hash (atau hash lama) tetap divalidasi ulang
+}
+PRECOMPRESSED_DIR = '.precompressed'
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html')
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_FINGERPRINT_RE = re.compile(r'^(?P<stem>.+)\.(?P<digest>[0-9a-f]{8})(?P<ext>\.[^./]+)$')
+# Folder yang nama filenya sudah memuat hash isi (varian poster dari images.py): tidak di-fingerprint ulang
+HASHED_PREFIXES = ('img/variants/',)
+
+
+class AssetManifest:
+    """Content hashes of the files under static/, recomputed only when a file changes"""
+
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self._entries = {}  # filename -> (mtime, size, digest)
+        self._lock = threading.Lock()
+
+    def digest(self, filename):
+        """8-char content hash of static/<filename>, or None if the file does not exist"""
+        path = os.path.join(self.static_folder, filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        entry = self._entries.get(filename)
+        if entry and entry[0] == stat.st_mtime and entry[1] == stat.st_size:
+            return entry[2]
+        with open(path, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()[:8]
+        with self._lock:
+            self._entries[filename] = (stat.st_mtime, stat.st_size, digest)
+        return digest
+
+    def fingerprint(self, filename):
+        """css/style.css -> css/style.1a2b3c4d.css"""
+        if filename.startswith(HASHED_PREFIXES):
+            return filename
+        digest = self.digest(filename)
+        if digest is None:
+            return filename
+        stem, ext = os.path.splitext(filename)
+        return f"{stem}.{digest}{ext}"
+
+    def precompress(self):
+        """Write .gz (and .br when available) copies of every compressible asset; returns the count"""
+        count = 0
+        for root, dirs, files in os.walk(self.static_folder):
+            dirs[:] = [d for d in dirs if d != PRECOMPRESSED_DIR]
+            for name in files:
+                if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                    continue
+                source = os.path.join(root, name)
+                relative = os.path.relpath(source, self.static_folder)
+                with open(source, 'rb') as f:
+                    data = f.read()
+                target = os.path.join(self.static_folder, PRECOMPRESSED_DIR, relative)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target + '.gz', 'wb') as f:
+                    f.write(gzip.compress(data, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    with open(target + '.br', 'wb') as f:
+                        f.write(brotli.compress(data, quality=11))
+                count += 1
+        return count
+
+
+manifest = None
+
+
+def url_for(endpoint, **values):
+    """Drop-in url_for for templates: static URLs get the content hash in their filename"""
+    if endpoint == 'static' and 'filename' in values:
+        values['filename'] = manifest.fingerprint(values['filename'])
+    return flask_url_for(endpoint, **values)
+
+
+def serve_static(filename):
+    """Static view that understands fingerprinted names and serves precompressed copies"""
+    max_age = ASSETS_CONFIG['default_max_age']
+    match = _FINGERPRINT_RE.match(filename)
+    if filename.startswith(HASHED_PREFIXES):
+        max_age = ASSETS_CONFIG['immutable_max_age']
+    elif match:
+        original = match.group('stem') + match.group('ext')
+        current = manifest.digest(original)
+        if current is not None:
+            # Hash lama tetap dilayani (isi terbaru), tetapi tanpa cache permanen
+            if current == match.group('digest'):
+                max_age = ASSETS_CONFIG['immutable_max_age']
+            filename = original
+
+    static_folder = current_app.static_folder
+    response = None
+    if filename.endswith(COMPRESSIBLE_EXTENSIONS):
+        for encoding, suffix in _accepted_encodings():
+            compressed = os.path.join(static_folder, PRECOMPRESSED_DIR, filename + suffix)
+            if _is_current(compressed, os.path.join(static_folder, filename)):
+                response = send_from_directory(os.path.join(static_folder, PRECOMPRESSED_DIR), filename + suffix,
+                                               mimetype=_mimetype(filename), max_age=max_age, conditional=True)
+                response.headers['Content-Encoding'] = encoding
+                break
+        if response is None:
+            response = send_from_directory(static_folder, filename, max_age=max_age, conditional=True)
+        response.vary.add('Accept-Encoding')
+    else:
+        response = send_from_directory(static_folder, filename, max_age=max_age, conditional=True)
+
+    if max_age == ASSETS_CONFIG['immutable_max_age']:
+        response.cache_control.immutable = True
+        response.cache_control.public = True
+    return response
+
+
+def _is_current(compressed, source):
+    """True if the precompressed copy exists and is not older than its source.
+
+    A copy whose source is missing (only the .gz/.br was deployed, or the
+    source was removed after `flask assets build`) is served as is.
+    """
+    try:
+        compressed_mtime = os.path.getmtime(compressed)
+    except OSError:
+        return False
+    try:
+        return compressed_mtime >= os.path.getmtime(source)
+    except OSError:
+        return True
+
+
+def _accepted_encodings():
+    """ENCODINGS the client accepts (q > 0, so `br;q=0` opts out), highest q first"""
+    accepted = request.accept_encodings
+    ranked = [(accepted.quality(encoding), index, encoding, suffix)
+              for index, (encoding, suffix) in enumerate(ENCODINGS)]
+    return [(encoding, suffix) for quality, _, encoding, suffix in sorted(ranked, key=lambda r: (-r[0], r[1]))
+            if quality > 0]
+
+
+def _mimetype(filename):
+    return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+def init_app(app):
+    """Fingerprint static URLs in templates, replace the static view and add `flask assets build`"""
+    global manifest
+    for key in ASSETS_CONFIG:
+        config_key = f'ASSETS_{key.upper()}'
+        if config_key in app.config:
+            ASSETS_CONFIG[key] = app.config[config_key]
+    manifest = AssetManifest(app.static_folder)
+    app.jinja_env.globals['url_for'] = url_for
+    app.view_functions['static'] = serve_static
+
+    @app.cli.group('assets')
+    def assets_cli():
+        """Static asset pipeline."""
+
+    @assets_cli.command('build')
+    def build():
+        """Write gzip/brotli copies of compressible static files."""
+        print(f'{manifest.precompress()} file dikompresi{" (gzip + brotli)" if brotli else " (gzip)"}.')
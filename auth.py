@@ -0,0 +1,195 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.security import generate_password_hash, check_password_hash
+
+import metrics
+
+# Konfigurasi Login
+AUTH_CONFIG = {
+    'hash_method': 'pbkdf2:sha256:600000',  # hash lama dengan parameter lain di-rehash saat login berhasil
+    'workers': 2,           # hash yang dihitung bersamaan; sisa CPU tetap untuk browse/checkout
+    'queue_limit': 32,      # permintaan yang boleh menunggu worker sebelum ditolak
+    'wait_timeout': 5,      # detik maksimal menunggu hasil hash
+    'ip_limit': 30,         # percobaan login per IP ...
+    'ip_window': 60,        # ... per sekian detik
+    'email_limit': 5,       # login gagal per email ...
+    'email_window': 300,    # ... per sekian detik
+    'trusted_proxies': 0,   # jumlah reverse proxy di depan app; >0 = IP klien diambil dari X-Forwarded-For
+}
+
+
+class LoginThrottled(Exception):
+    """Raised when an IP or email exceeded its login attempt budget"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Too many login attempts, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class HasherBusy(Exception):
+    """Raised when the hash worker queue is full or the result took too long"""
+
+
+class SlidingWindowLimiter:
+    """Per-key attempt log; a key is blocked once it has `limit` entries inside `window` seconds"""
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self._hits = {}  # key -> deque of timestamps
+        self._lock = threading.Lock()
+        self._adds = 0
+
+    def retry_after(self, key, now=None):
+        """0 if key may try again now, otherwise the seconds until the oldest attempt expires"""
+        now = now or time.monotonic()
+        with self._lock:
+            hits = self._prune(key, now)
+            if hits is None or len(hits) < self.limit:
+                return 0
+            return max(1, int(hits[0] + self.window - now + 0.999))
+
+    def add(self, key, now=None):
+        now = now or time.monotonic()
+        with self._lock:
+            hits = self._prune(key, now)
+            if hits is None:
+                hits = self._hits[key] = deque()
+            hits.append(now)
+            self._adds += 1
+            if self._adds % 1000 == 0:
+                # Buang kunci yang sudah tidak aktif agar memori tidak tumbuh terus
+                for stale in [k for k, v in self._hits.items() if not v or v[-1] <= now - self.window]:
+                    del self._hits[stale]
+
+    def reset(self, key):
+        with self._lock:
+            self._hits.pop(key, None)
+
+    def _prune(self, key, now):
+        hits = self._hits.get(key)
+        if hits is not None:
+            while hits and hits[0] <= now - self.window:
+                hits.popleft()
+        return hits
+
+
+class HashWorkerPool:
+    """Runs password hashing on a few threads with a bounded queue in front of them.
+
+    hashlib releases the GIL while it computes PBKDF2, so `workers` caps how many
+    cores a login storm can take; callers beyond workers + queue_limit get
+    HasherBusy straight away instead of piling up request threads.
+    """
+
+    def __init__(self, workers, queue_limit, wait_timeout):
+        self.wait_timeout = wait_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='festix-hash')
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+
+    def run(self, op, func, *args):
+        if not self._slots.acquire(blocking=False):
+            metrics.login_rejections_total.inc('busy')
+            raise HasherBusy("Password hash queue is full")
+        try:
+            future = self._executor.submit(self._timed, op, time.perf_counter(), func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.wait_timeout)
+        except FutureTimeout:
+            future.cancel()
+            metrics.login_rejections_total.inc('timeout')
+            raise HasherBusy("Password hash timed out")
+
+    @staticmethod
+    def _timed(op, queued_at, func, *args):
+        start = time.perf_counter()
+        metrics.password_hash_wait.observe(start - queued_at, op)
+        try:
+            return func(*args)
+        finally:
+            metrics.password_hash_duration.observe(time.perf_counter() - start, op)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_ip_limiter = SlidingWindowLimiter(AUTH_CONFIG['ip_limit'], AUTH_CONFIG['ip_window'])
+_email_limiter = SlidingWindowLimiter(AUTH_CONFIG['email_limit'], AUTH_CONFIG['email_window'])
+# Hash pembanding untuk email yang tidak terdaftar, supaya waktu respons tidak membocorkannya
+_dummy_hash = None
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashWorkerPool(AUTH_CONFIG['workers'], AUTH_CONFIG['queue_limit'], AUTH_CONFIG['wait_timeout'])
+    return _pool
+
+
+def hash_password(password):
+    """Hash with the configured method on the worker pool"""
+    return _get_pool().run('hash', generate_password_hash, password, AUTH_CONFIG['hash_method'])
+
+
+def verify_password(pwhash, password):
+    """Check a password on the worker pool; pwhash None burns the same time and returns False"""
+    global _dummy_hash
+    if pwhash is None:
+        if _dummy_hash is None:
+            # Dibuat di pool juga, agar badai login ke email tak dikenal tidak menghitung hash di thread request
+            _dummy_hash = hash_password('festix-dummy')
+        _get_pool().run('verify', check_password_hash, _dummy_hash, password)
+        return False
+    return _get_pool().run('verify', check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash):
+    """True when pwhash was made with different parameters than hash_method"""
+    return pwhash.split('$', 1)[0] != AUTH_CONFIG['hash_method']
+
+
+def check_login_allowed(ip, email):
+    """Raise LoginThrottled if this IP or email has used up its attempts"""
+    retry_after = max(_ip_limiter.retry_after(ip), _email_limiter.retry_after(email.lower()))
+    if retry_after:
+        metrics.login_rejections_total.inc('throttled')
+        raise LoginThrottled(retry_after)
+    _ip_limiter.add(ip)
+
+
+def record_login_result(email, success):
+    """Failed logins count against the email; a successful one clears its record"""
+    if success:
+        _email_limiter.reset(email.lower())
+    else:
+        _email_limiter.add(email.lower())
+
+
+def init_app(app):
+    """Read AUTH_* settings (AUTH_WORKERS, AUTH_IP_LIMIT, ...) and start the hash workers"""
+    global _pool, _ip_limiter, _email_limiter, _dummy_hash
+    for key in AUTH_CONFIG:
+        config_key = f'AUTH_{key.upper()}'
+        if config_key in app.config:
+            AUTH_CONFIG[key] = app.config[config_key]
+    if _pool is not None:
+        _pool.shutdown()
+    _pool = None
+    _dummy_hash = None
+    _ip_limiter = SlidingWindowLimiter(AUTH_CONFIG['ip_limit'], AUTH_CONFIG['ip_window'])
+    _email_limiter = SlidingWindowLimiter(AUTH_CONFIG['email_limit'], AUTH_CONFIG['email_window'])
+    if AUTH_CONFIG['trusted_proxies']:
+        # Tanpa ini semua login di belakang proxy memakai IP proxy dan berbagi satu batas percobaan
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=AUTH_CONFIG['trusted_proxies'])
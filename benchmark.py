@@ -0,0 +1,316 @@
+"""Load test for the core FesTix flows.
+
+Seeds a dedicated database, then drives concurrent simulated buyers through the
+Flask app (in-process test clients, one per buyer thread) and reports latency
+percentiles, throughput, DB query counts and whether the hot event was oversold.
+
+    python benchmark.py --events 500 --users 200 --buyers 50 --duration 30
+    python benchmark.py --no-seed --compare bench_results/20250101-120000.json
+    python benchmark.py --backend sqlite --compare bench_results/20250101-120000.json
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import re
+import threading
+import time
+
+from werkzeug.security import generate_password_hash
+
+import db
+import migrate
+import waiting_room
+
+BENCH_PASSWORD = 'bench-password'
+DEFAULT_MIX = 'browse=40,search=20,detail=20,login=5,purchase=15'
+SEARCH_TERMS = ['festival', 'jazz', 'rock', 'jakarta', 'bali', 'live', 'tour', 'music', 'fest', 'band']
+WORDS = ['Festival', 'Jazz', 'Rock', 'Live', 'Tour', 'Music', 'Night', 'Fest', 'Band', 'Session', 'Concert', 'Party']
+CITIES = ['Jakarta', 'Bandung', 'Bali', 'Surabaya', 'Yogyakarta', 'Medan', 'Makassar', 'Semarang']
+
+
+class QueryCounter:
+    """Counts every statement the models send to the database"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, sql, seconds):
+        with self._lock:
+            self.count += 1
+
+
+def seed(num_users, num_events, num_transactions, hot_stock):
+    """Recreate the benchmark data; returns (hot_event_id, hot_event_initial_stock)"""
+    rng = random.Random(42)
+    migrate.upgrade(echo=lambda message: None)  # skema + index sama dengan produksi
+    conn = db.get_connection()
+    try:
+        with conn.cursor() as cursor:
+            for table in ('transactions', 'stock_holds', 'sales_summary', 'events', 'users'):
+                cursor.execute(f"SHOW TABLES LIKE '{table}'")
+                if cursor.fetchone():
+                    cursor.execute(f"DELETE FROM {table}")
+
+            password = generate_password_hash(BENCH_PASSWORD)  # satu hash untuk semua user, seeding tetap cepat
+            conn.begin()
+            cursor.executemany(
+                "INSERT INTO users (nama_lengkap, email, password) VALUES (%s, %s, %s)",
+                [(f'Bench User {i}', f'bench{i}@festix.test', password) for i in range(num_users)]
+            )
+            today = datetime.date.today()
+            cursor.executemany(
+                "INSERT INTO events (nama_event, tanggal, lokasi, harga, stok, deskripsi, gambar) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                [(' '.join(rng.sample(WORDS, 3)) + f' {i}',
+                  today + datetime.timedelta(days=rng.randint(-180, 365)),
+                  rng.choice(CITIES),
+                  rng.choice([150000, 250000, 500000, 750000, 1500000]),
+                  rng.randint(100, 5000),
+                  ' '.join(rng.choices(WORDS + CITIES, k=60)),
+                  '') for i in range(num_events)]
+            )
+            cursor.execute("SELECT MIN(id) AS min_id, MAX(id) AS max_id FROM events")
+            ids = cursor.fetchone()
+            hot_event_id = ids['min_id']
+            cursor.execute("UPDATE events SET nama_event = 'Hot On-Sale Festival', stok = %s WHERE id = %s", (hot_stock, hot_event_id))
+            cursor.execute("SELECT MIN(id) AS min_id, MAX(id) AS max_id FROM users")
+            user_ids = cursor.fetchone()
+            cursor.executemany(
+                "INSERT INTO transactions (user_id, event_id, jumlah_tiket, total_bayar, nama_pemesan, email_pemesan, no_telepon) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                [(rng.randint(user_ids['min_id'], user_ids['max_id']),
+                  rng.randint(ids['min_id'] + 1, ids['max_id']) if ids['max_id'] > ids['min_id'] else ids['min_id'],
+                  n, n * 250000, 'Bench', 'bench@festix.test', '0800') for n in (rng.randint(1, 4) for _ in range(num_transactions))]
+            )
+            conn.commit()
+    finally:
+        conn.close()
+
+    from models import SalesSummary, SalesRollup
+    SalesSummary.rebuild()
+    SalesRollup.rebuild()
+    return hot_event_id, hot_stock
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Buyer:
+    """One simulated visitor with its own test client (and therefore its own session)"""
+
+    def __init__(self, app, index, num_users, event_ids, hot_event_id, rng):
+        self.client = app.test_client()
+        # Setiap pembeli punya IP sendiri agar pembatasan login per IP tidak ikut terukur
+        self.client.environ_base['REMOTE_ADDR'] = f'10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}'
+        self.email = f'bench{index % max(num_users, 1)}@festix.test'
+        self.event_ids = event_ids
+        self.hot_event_id = hot_event_id
+        self.rng = rng
+        self.logged_in = False
+        self.tickets_bought = 0
+
+    def browse(self):
+        return self.client.get('/')
+
+    def search(self):
+        return self.client.get('/', query_string={'search': self.rng.choice(SEARCH_TERMS)})
+
+    def detail(self):
+        return self.client.get(f'/event/{self.rng.choice(self.event_ids)}')
+
+    def login(self):
+        response = self.client.post('/login', data={'email': self.email, 'password': BENCH_PASSWORD})
+        self.logged_in = response.status_code == 302 and '/login' not in response.location
+        return response
+
+    def purchase(self):
+        if not self.logged_in:
+            self.login()
+        jumlah = self.rng.randint(1, 2)
+        response = self.client.post(f'/beli/{self.hot_event_id}', data={'jumlah': jumlah})
+        match = re.search(rb'name="hold_id" value="(\d+)"', response.data)
+        token = re.search(rb'name="checkout_token" value="([\w-]+)"', response.data)
+        if response.status_code != 200 or not match or not token:
+            return response
+        response = self.client.post(f'/proses_checkout/{self.hot_event_id}', data={
+            'jumlah_tiket': jumlah, 'hold_id': match.group(1).decode(), 'checkout_token': token.group(1).decode(),
+            'nama_pemesan': 'Bench', 'email_pemesan': self.email, 'no_telepon': '0800',
+        })
+        if response.status_code == 302 and response.location.endswith('/tiket_saya'):
+            self.tickets_bought += jumlah
+        return response
+
+
+def run(app, args, event_ids, hot_event_id):
+    mix = [(name, int(weight)) for name, weight in (part.split('=') for part in args.mix.split(','))]
+    names, weights = zip(*mix)
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    buyers = []
+
+    def worker(i):
+        rng = random.Random(1000 + i)
+        buyer = Buyer(app, i, args.users, event_ids, hot_event_id, rng)
+        buyers.append(buyer)
+        while time.perf_counter() < deadline:
+            flow = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                response = getattr(buyer, flow)()
+                failed = response.status_code >= 500
+            except Exception:
+                failed = True
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies[flow].append(elapsed)
+                if failed:
+                    errors[flow] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.buyers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    return latencies, errors, wall, sum(b.tickets_bought for b in buyers)
+
+
+def oversell_report(hot_event_id, initial_stock):
+    conn = db.get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT stok FROM events WHERE id = %s", (hot_event_id,))
+            stok = cursor.fetchone()['stok']
+            cursor.execute("SELECT COALESCE(SUM(jumlah_tiket), 0) AS sold FROM transactions WHERE event_id = %s", (hot_event_id,))
+            sold = int(cursor.fetchone()['sold'])
+    finally:
+        conn.close()
+    return {'initial_stock': initial_stock, 'sold': sold, 'remaining': stok, 'oversold': max(0, sold - initial_stock)}
+
+
+def summarize(latencies, errors, wall, queries):
+    flows = {}
+    total = 0
+    for flow, values in latencies.items():
+        values.sort()
+        total += len(values)
+        flows[flow] = {
+            'requests': len(values),
+            'errors': errors[flow],
+            'rps': round(len(values) / wall, 2) if wall else 0,
+            'p50_ms': round(percentile(values, 50) * 1000, 2) if values else None,
+            'p95_ms': round(percentile(values, 95) * 1000, 2) if values else None,
+            'p99_ms': round(percentile(values, 99) * 1000, 2) if values else None,
+        }
+    return {
+        'wall_seconds': round(wall, 2),
+        'requests': total,
+        'rps': round(total / wall, 2) if wall else 0,
+        'db_queries': queries,
+        'db_queries_per_request': round(queries / total, 2) if total else 0,
+        'flows': flows,
+    }
+
+
+def print_report(result, baseline=None):
+    print(f"\n{'flow':<10}{'reqs':>8}{'err':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for flow, stats in result['summary']['flows'].items():
+        line = f"{flow:<10}{stats['requests']:>8}{stats['errors']:>6}{stats['rps']:>10}"
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            line += f"{stats[key] if stats[key] is not None else '-':>10}"
+        if baseline and flow in baseline['summary']['flows'] and baseline['summary']['flows'][flow]['p95_ms']:
+            before = baseline['summary']['flows'][flow]['p95_ms']
+            if stats['p95_ms'] is not None:
+                line += f"   p95 {((stats['p95_ms'] - before) / before) * 100:+.1f}% vs baseline"
+        print(line)
+    summary = result['summary']
+    print(f"\ntotal {summary['requests']} requests in {summary['wall_seconds']}s = {summary['rps']} req/s")
+    print(f"db queries: {summary['db_queries']} ({summary['db_queries_per_request']} per request)")
+    oversell = result['oversell']
+    print(f"hot event: stock {oversell['initial_stock']}, sold {oversell['sold']} "
+          f"(confirmed to buyers {oversell['confirmed_to_buyers']}), remaining {oversell['remaining']}, oversold {oversell['oversold']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FesTix load test')
+    parser.add_argument('--database', default='FesTix_bench', help='database to seed and test against (never the production one)')
+    parser.add_argument('--backend', choices=('mysql', 'sqlite'), default=db.DB_BACKEND,
+                        help='storage engine; sqlite uses <output>/<database>.sqlite3')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--events', type=int, default=500)
+    parser.add_argument('--transactions', type=int, default=2000)
+    parser.add_argument('--hot-stock', type=int, default=100, help='stock of the contended on-sale event')
+    parser.add_argument('--buyers', type=int, default=50, help='concurrent simulated buyers')
+    parser.add_argument('--duration', type=float, default=20, help='seconds to run')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='flow weights, e.g. browse=40,purchase=60')
+    parser.add_argument('--no-seed', action='store_true', help='reuse the data from the previous run')
+    parser.add_argument('--output', default='bench_results', help='directory for the JSON result')
+    parser.add_argument('--compare', help='earlier JSON result to compare p95 against')
+    args = parser.parse_args()
+
+    from app import app
+    if args.backend == 'sqlite':
+        os.makedirs(args.output, exist_ok=True)
+        db.configure('sqlite', path=os.path.abspath(os.path.join(args.output, f'{args.database}.sqlite3')))
+    else:
+        db.configure('mysql', database=args.database)
+    # Room sudah dibuat saat app di-import; ukur checkout tanpa antrean
+    waiting_room.room.config['enabled'] = False
+
+    if args.no_seed:
+        conn = db.get_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT id, stok FROM events WHERE nama_event = 'Hot On-Sale Festival'")
+                hot = cursor.fetchone()
+                cursor.execute("SELECT COALESCE(SUM(jumlah_tiket), 0) AS sold FROM transactions WHERE event_id = %s", (hot['id'],))
+                hot_event_id, initial_stock = hot['id'], hot['stok'] + int(cursor.fetchone()['sold'])
+        finally:
+            conn.close()
+    else:
+        print(f"Seeding {args.database} ({args.backend}): {args.users} users, {args.events} events, {args.transactions} transactions...")
+        hot_event_id, initial_stock = seed(args.users, args.events, args.transactions, args.hot_stock)
+
+    conn = db.get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT id FROM events")
+            event_ids = [row['id'] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+    counter = QueryCounter()
+    db.listen('query', counter)
+    print(f"Running {args.buyers} buyers for {args.duration}s (mix {args.mix})...")
+    latencies, errors, wall, tickets_bought = run(app, args, event_ids, hot_event_id)
+
+    result = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'config': vars(args),
+        'summary': summarize(latencies, errors, wall, counter.count),
+        'oversell': dict(oversell_report(hot_event_id, initial_stock), confirmed_to_buyers=tickets_bought),
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, datetime.datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResult saved to {path}")
+
+
+if __name__ == '__main__':
+    main()
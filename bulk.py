@@ -0,0 +1,205 @@
+import csv
+import datetime
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from models import Event, Transaction
+
+EVENT_FIELDS = ('nama_event', 'tanggal', 'lokasi', 'harga', 'stok', 'deskripsi', 'gambar')
+TRANSACTION_FIELDS = ('id', 'tanggal_transaksi', 'user_id', 'nama_lengkap', 'event_id', 'nama_event', 'jumlah_tiket',
+                      'total_bayar', 'nama_pemesan', 'email_pemesan', 'no_telepon', 'catatan')
+BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+_CHUNK = 64 * 1024
+
+
+class ImportReport:
+    """Outcome of a bulk import; errors holds (row number, message), capped at MAX_REPORTED_ERRORS"""
+
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, row_number, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row_number, message))
+
+    @property
+    def truncated(self):
+        return self.failed > len(self.errors)
+
+
+# --- Membaca file (streaming) ---
+
+def iter_csv(stream):
+    """Yield dict rows from a binary CSV stream"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.DictReader(text)
+    finally:
+        text.detach()
+
+
+def iter_json(stream):
+    """Yield objects from a binary stream holding a JSON array or JSON Lines, without loading it whole"""
+    decoder = json.JSONDecoder()
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig')
+    buffer, pos, in_array, started, eof = '', 0, False, False, False
+    try:
+        while True:
+            # Lewati spasi dan pemisah array
+            while pos < len(buffer) and (buffer[pos].isspace() or (in_array and buffer[pos] == ',')):
+                pos += 1
+            if pos < len(buffer) and not started:
+                started = True
+                if buffer[pos] == '[':
+                    in_array = True
+                    pos += 1
+                    continue
+            if pos < len(buffer) and in_array and buffer[pos] == ']':
+                return
+            if pos < len(buffer):
+                try:
+                    obj, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    # Angka di ujung buffer bisa saja belum lengkap; tunggu potongan berikutnya
+                    if end < len(buffer) or eof:
+                        yield obj
+                        pos = end
+                        continue
+            elif eof:
+                if in_array:
+                    raise ValueError("JSON array is not closed")
+                return
+            chunk = text.read(_CHUNK)
+            buffer, pos = buffer[pos:] + chunk, 0
+            eof = not chunk
+    finally:
+        text.detach()
+
+
+def _parse_event(row):
+    """Validate one input row; returns the tuple for Event.create_many or raises ValueError"""
+    if not isinstance(row, dict):
+        raise ValueError("baris harus berupa objek")
+    values = {field: row.get(field) for field in EVENT_FIELDS}
+    for field in ('nama_event', 'lokasi'):
+        value = str(values[field] or '').strip()
+        if not value:
+            raise ValueError(f"{field} wajib diisi")
+        if len(value) > 255:
+            raise ValueError(f"{field} lebih dari 255 karakter")
+        values[field] = value
+    try:
+        values['tanggal'] = datetime.date.fromisoformat(str(values['tanggal'] or '').strip())
+    except ValueError:
+        raise ValueError(f"tanggal tidak valid: {values['tanggal']!r} (format YYYY-MM-DD)")
+    try:
+        values['harga'] = Decimal(str(values['harga']).strip())
+    except InvalidOperation:
+        raise ValueError(f"harga tidak valid: {values['harga']!r}")
+    if not values['harga'].is_finite() or values['harga'] < 0:
+        raise ValueError("harga harus angka >= 0")
+    try:
+        values['stok'] = int(str(values['stok']).strip())
+    except ValueError:
+        raise ValueError(f"stok tidak valid: {values['stok']!r}")
+    if values['stok'] < 0:
+        raise ValueError("stok harus >= 0")
+    values['deskripsi'] = str(values['deskripsi'] or '')
+    gambar = str(values['gambar'] or '').strip()
+    if '/' in gambar or '\\' in gambar:
+        raise ValueError("gambar harus nama file di static/img, bukan path")
+    values['gambar'] = gambar
+    return tuple(values[field] for field in EVENT_FIELDS)
+
+
+def import_events(stream, fmt, batch_size=BATCH_SIZE):
+    """Validate and insert events from a CSV/JSON stream in executemany batches.
+
+    A batch the database rejects is retried row by row so the report names the
+    offending rows; every other row still gets inserted.
+    """
+    rows = iter_csv(stream) if fmt == 'csv' else iter_json(stream)
+    report = ImportReport()
+    batch = []  # (row number, values)
+    row_number = 0
+    try:
+        for row_number, row in enumerate(rows, start=1):
+            try:
+                batch.append((row_number, _parse_event(row)))
+            except ValueError as e:
+                report.add_error(row_number, str(e))
+            if len(batch) >= batch_size:
+                _flush(batch, report)
+                batch = []
+    except (ValueError, csv.Error) as e:
+        # File rusak: baris yang sudah terbaca tetap diimpor
+        report.add_error(row_number + 1, f"file tidak dapat dibaca: {e}")
+    if batch:
+        _flush(batch, report)
+    report.errors.sort()
+    return report
+
+
+def _flush(batch, report):
+    try:
+        report.inserted += Event.create_many([values for _, values in batch])
+    except Exception:
+        for row_number, values in batch:
+            try:
+                report.inserted += Event.create_many([values])
+            except Exception as e:
+                report.add_error(row_number, f"ditolak database: {e}")
+
+
+# --- Ekspor (streaming) ---
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def stream_rows(rows, fields, fmt):
+    """Serialise dict rows to CSV or a JSON array in chunks of roughly 64 KB"""
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow([row.get(field) for field in fields])
+            if buffer.tell() >= _CHUNK:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    else:
+        buffer.write('[')
+        separator = '\n'
+        for row in rows:
+            buffer.write(separator)
+            buffer.write(json.dumps({field: row.get(field) for field in fields}, default=_json_default))
+            separator = ',\n'
+            if buffer.tell() >= _CHUNK:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        buffer.write('\n]\n')
+    yield buffer.getvalue()
+
+
+def export_events(fmt):
+    return stream_rows(Event.iter_all(), ('id',) + EVENT_FIELDS, fmt)
+
+
+def export_transactions(fmt, event_id=None, date_from=None, date_to=None):
+    rows = Transaction.stream_with_details(event_id, date_from, date_to)
+    return stream_rows(rows, TRANSACTION_FIELDS, fmt)
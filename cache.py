@@ -0,0 +1,169 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+import db_sqlite
+
+# Konfigurasi Cache (detik)
+CACHE_CONFIG = {
+    'backend': 'memory',       # 'memory' (per proses) atau 'sqlite' (dibagi antar worker)
+    'path': 'festix_cache.sqlite3',
+    'max_entries': 1024,
+    'catalogue_ttl': 10,       # daftar event: stok boleh basi paling lama sekian detik
+    'event_ttl': 60,           # detail event: juga dihapus setiap ada pembelian
+}
+
+
+class CacheBackend:
+    """Interface every cache backend implements; get() returns None on a miss"""
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """In-process cache with per-entry TTL and LRU eviction"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCache(CacheBackend):
+    """Cache stored in a local SQLite file so every worker on the box shares it.
+
+    Entries expire by TTL; when the table grows past max_entries the entries
+    closest to expiry are evicted first.
+    """
+
+    def __init__(self, path, max_entries=1024):
+        self.path = path
+        self.max_entries = max_entries
+        self._db = db_sqlite.LocalDatabase(path)
+        self._writes = 0
+        with self._db.connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)")
+
+    def get(self, key):
+        row = self._db.connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        conn = self._db.connection()
+        conn.execute("INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                     (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires_at))
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self._evict(conn)
+
+    def _evict(self, conn):
+        conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        conn.execute("""
+            DELETE FROM cache WHERE key IN (
+                SELECT key FROM cache ORDER BY expires_at IS NULL, expires_at LIMIT max(0, (SELECT COUNT(*) FROM cache) - ?)
+            )
+        """, (self.max_entries,))
+
+    def delete(self, key):
+        self._db.connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        self._db.connection().execute("DELETE FROM cache")
+
+
+backend = MemoryCache(CACHE_CONFIG['max_entries'])
+
+
+def configure(new_backend):
+    """Swap the active cache backend"""
+    global backend
+    backend = new_backend
+
+
+def get(key):
+    return backend.get(key)
+
+
+def set(key, value, ttl=None):
+    backend.set(key, value, ttl)
+
+
+def delete(key):
+    backend.delete(key)
+
+
+def clear():
+    backend.clear()
+
+
+def version(namespace):
+    """Current generation of a namespace; keys built with it go stale when bump() is called"""
+    key = f'{namespace}:version'
+    current = backend.get(key)
+    if current is None:
+        # Never restart from 0, otherwise an evicted counter could resurrect old entries
+        current = time.time_ns()
+        backend.set(key, current)
+    return current
+
+
+def bump(namespace):
+    new_version = time.time_ns()
+    backend.set(f'{namespace}:version', new_version)
+    return new_version
+
+
+def init_app(app):
+    """Pick the backend and TTLs from app.config (CACHE_BACKEND, CACHE_PATH, ...)"""
+    for key in CACHE_CONFIG:
+        config_key = f'CACHE_{key.upper()}'
+        if config_key in app.config:
+            CACHE_CONFIG[key] = app.config[config_key]
+    if CACHE_CONFIG['backend'] == 'sqlite':
+        path = db_sqlite.instance_file(app, CACHE_CONFIG['path'])
+        configure(SQLiteCache(path, CACHE_CONFIG['max_entries']))
+    else:
+        configure(MemoryCache(CACHE_CONFIG['max_entries']))
@@ -0,0 +1,330 @@
+import os
+import threading
+import time
+from collections import deque
+
+import pymysql
+from pymysql.constants import SERVER_STATUS
+
+# Backend penyimpanan: 'mysql' (server MySQL via PyMySQL) atau 'sqlite' (file lokal, lihat db_sqlite.py)
+DB_BACKEND = os.environ.get('DB_BACKEND', 'mysql')
+
+# Konfigurasi Database (MySQL)
+DB_CONFIG = {
+    'host': os.environ.get('DB_HOST', 'localhost'),
+    'port': int(os.environ.get('DB_PORT', 3306)),
+    'user': os.environ.get('DB_USER', 'root'),
+    'password': os.environ.get('DB_PASSWORD', ''),
+    'database': os.environ.get('DB_NAME', 'FesTix_db'),
+    'cursorclass': pymysql.cursors.DictCursor,
+    'autocommit': True,
+}
+
+# Konfigurasi SQLite (mode WAL; satu file, cocok untuk satu mesin)
+SQLITE_CONFIG = {
+    'path': os.environ.get('DB_SQLITE_PATH', 'festix.sqlite3'),
+    'timeout': 5,               # seconds a writer waits for the write lock
+    'synchronous': 'NORMAL',    # NORMAL is durable enough with WAL; FULL fsyncs every commit
+}
+
+# app.config key -> (config dict, key); semua juga bisa lewat env FLASK_<KEY>
+_SETTINGS = {
+    'DB_HOST': (DB_CONFIG, 'host'),
+    'DB_PORT': (DB_CONFIG, 'port'),
+    'DB_USER': (DB_CONFIG, 'user'),
+    'DB_PASSWORD': (DB_CONFIG, 'password'),
+    'DB_NAME': (DB_CONFIG, 'database'),
+    'DB_SQLITE_PATH': (SQLITE_CONFIG, 'path'),
+    'DB_SQLITE_TIMEOUT': (SQLITE_CONFIG, 'timeout'),
+    'DB_SQLITE_SYNCHRONOUS': (SQLITE_CONFIG, 'synchronous'),
+}
+
+# Konfigurasi Pool
+POOL_CONFIG = {
+    'pool_size': 5,        # connections kept open between requests
+    'max_overflow': 10,    # extra connections allowed under load, closed on release
+    'timeout': 30,         # seconds to wait for a free connection
+    'idle_timeout': 300,   # idle connections older than this are pinged before reuse
+    'recycle': 3600,       # connections older than this are replaced
+    'pre_ping': True,
+}
+
+
+# InnoDB memilih satu transaksi sebagai korban deadlock / lock wait timeout; aman diulang dari awal
+RETRYABLE_ERRORS = {1205, 1213}
+
+
+def is_deadlock(error):
+    """True for MySQL errors whose transaction was rolled back and can simply be retried"""
+    return isinstance(error, pymysql.err.OperationalError) and bool(error.args) and error.args[0] in RETRYABLE_ERRORS
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout"""
+
+
+# Hooks untuk instrumentasi (lihat metrics.py)
+_listeners = {'query': [], 'statement': [], 'acquire': []}
+
+
+def listen(event, callback):
+    """Register callback for 'query' (sql, seconds), 'statement' (sql, args; before it runs) or 'acquire' (pool)"""
+    _listeners[event].append(callback)
+
+
+def unlisten(event, callback):
+    _listeners[event].remove(callback)
+
+
+class TimedCursor:
+    """Cursor wrapper that reports every statement and its duration to the query listeners"""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._raw.close()
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def execute(self, query, args=None):
+        for callback in _listeners['statement']:
+            callback(query, args)
+        start = time.perf_counter()
+        try:
+            return self._raw.execute(query, args)
+        finally:
+            self._notify(query, time.perf_counter() - start)
+
+    def executemany(self, query, args):
+        start = time.perf_counter()
+        try:
+            return self._raw.executemany(query, args)
+        finally:
+            self._notify(query, time.perf_counter() - start)
+
+    @staticmethod
+    def _notify(query, seconds):
+        for callback in _listeners['query']:
+            callback(query, seconds)
+
+
+class PooledConnection:
+    """Thin wrapper around a backend connection that returns itself to the pool on close()"""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.request_bound = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._raw.cursor(*args, **kwargs)
+        return TimedCursor(cursor) if _listeners['query'] or _listeners['statement'] else cursor
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        """Give the connection back; request-bound connections are released at teardown"""
+        if self.request_bound:
+            self._discard_open_transaction()
+            return
+        self._pool.release(self)
+
+    def discard(self):
+        """Close the underlying connection and give its pool slot back without reusing it"""
+        self._pool._close_raw(self)
+        self._pool.release(self)
+
+    def _discard_open_transaction(self):
+        # Same semantic as a real close(): uncommitted work never leaks to the next borrower
+        if self._raw.open and _in_transaction(self._raw):
+            self._raw.rollback()
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of database connections"""
+
+    def __init__(self, creator, pool_size=5, max_overflow=10, timeout=30, idle_timeout=300, recycle=3600, pre_ping=True):
+        self._creator = creator
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self._idle = deque()
+        self._checked_out = 0
+        self._lock = threading.Condition()
+
+    def acquire(self):
+        """Borrow a healthy connection, waiting up to `timeout` seconds when the pool is exhausted"""
+        deadline = time.monotonic() + self.timeout
+        with self._lock:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    self._checked_out += 1
+                    break
+                if self._checked_out < self.pool_size + self.max_overflow:
+                    conn = None
+                    self._checked_out += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                self._lock.wait(remaining)
+
+        try:
+            if conn is not None:
+                conn = self._checkout_existing(conn)
+            if conn is None:
+                conn = PooledConnection(self, self._creator())
+        except Exception:
+            with self._lock:
+                self._checked_out -= 1
+                self._lock.notify()
+            raise
+        conn.last_used = time.monotonic()
+        for callback in _listeners['acquire']:
+            callback(self)
+        return conn
+
+    def _checkout_existing(self, conn):
+        """Return conn if it is still usable, otherwise close it and return None"""
+        now = time.monotonic()
+        if self.recycle is not None and now - conn.created_at > self.recycle:
+            self._close_raw(conn)
+            return None
+        if self.pre_ping and now - conn.last_used > self.idle_timeout:
+            try:
+                conn._raw.ping(reconnect=False)
+            except Exception:
+                self._close_raw(conn)
+                return None
+        return conn
+
+    def release(self, conn):
+        """Return a borrowed connection to the pool"""
+        conn.request_bound = False
+        keep = conn._raw.open
+        if keep:
+            try:
+                conn._discard_open_transaction()
+            except Exception:
+                keep = False
+        with self._lock:
+            self._checked_out -= 1
+            if keep and len(self._idle) < self.pool_size:
+                conn.last_used = time.monotonic()
+                self._idle.append(conn)
+                conn = None
+            self._lock.notify()
+        if conn is not None:
+            self._close_raw(conn)
+
+    def dispose(self):
+        """Close every idle connection (e.g. after a fork or config change)"""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for conn in idle:
+            self._close_raw(conn)
+
+    def status(self):
+        with self._lock:
+            return {'idle': len(self._idle), 'checked_out': self._checked_out,
+                    'pool_size': self.pool_size, 'max_overflow': self.max_overflow}
+
+    @staticmethod
+    def _close_raw(conn):
+        try:
+            conn._raw.close()
+        except Exception:
+            pass
+
+
+def _connect():
+    if DB_BACKEND == 'sqlite':
+        import db_sqlite
+        return db_sqlite.SQLiteConnection(**SQLITE_CONFIG)
+    return pymysql.connect(**DB_CONFIG)
+
+
+def _in_transaction(raw):
+    if isinstance(raw, pymysql.connections.Connection):
+        return bool(raw.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS)
+    return raw.in_transaction
+
+
+def configure(backend=None, **settings):
+    """Switch backend and/or connection settings (keys of DB_CONFIG/SQLITE_CONFIG); idle connections are dropped"""
+    global DB_BACKEND
+    if backend is not None:
+        if backend not in ('mysql', 'sqlite'):
+            raise ValueError(f"Unknown DB_BACKEND {backend!r} (expected 'mysql' or 'sqlite')")
+        DB_BACKEND = backend
+    for key, value in settings.items():
+        target = SQLITE_CONFIG if key in SQLITE_CONFIG else DB_CONFIG
+        target[key] = value
+    pool.dispose()
+
+
+pool = ConnectionPool(_connect, **POOL_CONFIG)
+
+
+def get_connection():
+    """Borrow a connection; inside a Flask app context one connection is shared for the whole request"""
+    from flask import g, has_app_context
+
+    if not has_app_context():
+        return pool.acquire()
+    conn = g.get('_db_conn')
+    if conn is None:
+        conn = pool.acquire()
+        conn.request_bound = True
+        g._db_conn = conn
+    return conn
+
+
+def release_request_connection(exc=None):
+    from flask import g
+
+    conn = g.pop('_db_conn', None)
+    if conn is not None:
+        pool.release(conn)
+
+
+def init_app(app):
+    """Configure backend (DB_BACKEND, DB_HOST, ..., DB_SQLITE_PATH) and pool from app.config; release the request connection on teardown"""
+    settings = {}
+    for config_key, (target, key) in _SETTINGS.items():
+        if config_key in app.config:
+            # from_prefixed_env membaca angka sebagai int (mis. FLASK_DB_PASSWORD=1234)
+            value = app.config[config_key]
+            settings[key] = value if isinstance(target[key], int) else str(value)
+    backend = app.config.get('DB_BACKEND', DB_BACKEND)
+    path = settings.get('path', SQLITE_CONFIG['path'])
+    if backend == 'sqlite':
+        import db_sqlite
+        settings['path'] = db_sqlite.instance_file(app, path)
+    configure(backend, **settings)
+    for key in POOL_CONFIG:
+        config_key = f'DB_POOL_{key.upper()}'
+        if config_key in app.config:
+            setattr(pool, key, app.config[config_key])
+    app.teardown_appcontext(release_request_connection)
@@ -0,0 +1,241 @@
+"""Embedded SQLite backend with the slice of the PyMySQL API the models use.
+
+The models keep writing MySQL; statements are translated here once per distinct
+query string (placeholders, FOR UPDATE, upserts, DATE_FORMAT, SHOW TABLES and
+the DDL of migrations/). Writers are serialised by SQLite itself: begin() takes
+the write lock up front (BEGIN IMMEDIATE), which covers what SELECT ... FOR
+UPDATE locks on MySQL, while WAL keeps readers from blocking on it.
+"""
+import datetime
+import functools
+import os
+import re
+import sqlite3
+import threading
+from decimal import Decimal
+
+# Nilai Python -> SQLite, sama dengan yang dikirim PyMySQL ke MySQL
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(datetime.date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(' '))
+
+# Kolom bertipe DATE/DATETIME/TIMESTAMP/DECIMAL dibaca kembali sebagai tipe yang sama seperti dari PyMySQL
+sqlite3.register_converter('DATE', lambda raw: datetime.date.fromisoformat(raw.decode()))
+sqlite3.register_converter('DATETIME', lambda raw: datetime.datetime.fromisoformat(raw.decode()))
+sqlite3.register_converter('TIMESTAMP', lambda raw: datetime.datetime.fromisoformat(raw.decode()))
+sqlite3.register_converter('DECIMAL', lambda raw: Decimal(raw.decode()))
+
+_PLACEHOLDER = re.compile(r'%([s%])')
+_SHOW_TABLES = re.compile(r"^\s*SHOW TABLES LIKE '(\w+)'\s*$", re.I)
+_FOR_UPDATE = re.compile(r'\s+FOR UPDATE\b', re.I)
+_ON_DUPLICATE = re.compile(r'\bON DUPLICATE KEY UPDATE\b', re.I)
+_VALUES_REF = re.compile(r'\bVALUES\((\w+)\)', re.I)
+_CREATE_TABLE = re.compile(r'^\s*CREATE TABLE (IF NOT EXISTS )?(\w+)\s*\((.*)\)\s*$', re.I | re.S)
+_INDEX_DEF = re.compile(r'^(UNIQUE KEY|UNIQUE INDEX|UNIQUE|INDEX|KEY)\s+(\w+)\s*\(([^)]*)\)$', re.I)
+_ALTER_ADD_INDEX = re.compile(r'^\s*ALTER TABLE (\w+) ADD (UNIQUE KEY|UNIQUE INDEX|UNIQUE|INDEX|KEY) (\w+)\s*\(([^)]*)\)\s*$', re.I)
+_ALTER_ADD_CONSTRAINT = re.compile(r'^\s*ALTER TABLE \w+ ADD CONSTRAINT\b', re.I)
+_AUTO_INCREMENT = re.compile(r'\bINT(EGER)? AUTO_INCREMENT PRIMARY KEY\b', re.I)
+_ENUM = re.compile(r'\bENUM\([^)]*\)', re.I)
+# Hanya %Y %m %d %H yang dipakai model; artinya sama di DATE_FORMAT (MySQL) dan strftime (SQLite)
+_DATE_FORMAT = re.compile(r"\bDATE_FORMAT\((\w+), ('[%YmdH0-9 :-]*')\)", re.I)
+
+
+def _split_definitions(body):
+    """Split a CREATE TABLE body on the commas that are not inside parentheses"""
+    parts, depth, start = [], 0, 0
+    for i, char in enumerate(body):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(body[start:i].strip())
+            start = i + 1
+    parts.append(body[start:].strip())
+    return [part for part in parts if part]
+
+
+def _create_index(kind, name, table, columns):
+    unique = 'UNIQUE ' if kind.upper().startswith('UNIQUE') else ''
+    return f"CREATE {unique}INDEX IF NOT EXISTS {name} ON {table} ({columns})"
+
+
+def _translate_create_table(match):
+    if_not_exists, table, body = match.groups()
+    columns, indexes = [], []
+    for definition in _split_definitions(body):
+        index = _INDEX_DEF.match(definition)
+        if index:
+            # SQLite tidak punya INDEX di dalam CREATE TABLE; dibuat sesudahnya
+            indexes.append(_create_index(index.group(1), index.group(2), table, index.group(3)))
+            continue
+        definition = _AUTO_INCREMENT.sub('INTEGER PRIMARY KEY AUTOINCREMENT', definition)
+        columns.append(_ENUM.sub('TEXT', definition))
+    create = f"CREATE TABLE {if_not_exists or ''}{table} (\n    " + ',\n    '.join(columns) + "\n)"
+    return [create] + indexes
+
+
+@functools.lru_cache(maxsize=1024)
+def translate(query):
+    """MySQL statement -> list of SQLite statements (empty when there is nothing to do)"""
+    match = _SHOW_TABLES.match(query)
+    if match:
+        return [f"SELECT name FROM sqlite_master WHERE type = 'table' AND name = '{match.group(1)}'"]
+    match = _CREATE_TABLE.match(query)
+    if match:
+        return _translate_create_table(match)
+    match = _ALTER_ADD_INDEX.match(query)
+    if match:
+        table, kind, name, columns = match.groups()
+        return [_create_index(kind, name, table, columns)]
+    if _ALTER_ADD_CONSTRAINT.match(query):
+        # CHECK hanya bisa dipasang saat CREATE TABLE di SQLite
+        return []
+    query = _FOR_UPDATE.sub('', query)
+    query = _DATE_FORMAT.sub(r'strftime(\2, \1)', query)
+    match = _ON_DUPLICATE.search(query)
+    if match:
+        head, tail = query[:match.start()], query[match.end():]
+        if re.search(r'\bSELECT\b', head, re.I) and not re.search(r'\bWHERE\b', head, re.I):
+            # INSERT ... SELECT tanpa WHERE ambigu bagi parser SQLite sebelum ON CONFLICT
+            head = re.sub(r'(\bFROM\s+\w+)', r'\1 WHERE true', head, count=1, flags=re.I)
+        query = head + 'ON CONFLICT DO UPDATE SET' + _VALUES_REF.sub(r'excluded.\1', tail)
+    return [query]
+
+
+def _placeholders(sql):
+    return _PLACEHOLDER.sub(lambda m: '?' if m.group(1) == 's' else '%', sql)
+
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+def connect(path, timeout=5, synchronous='NORMAL', **options):
+    """Autocommit sqlite3 connection in WAL mode; every SQLite file of the app is opened through here.
+
+    WAL lets readers run next to the single writer, timeout is how long a
+    writer waits for the lock before "database is locked".
+    """
+    conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, **options)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={synchronous}")
+    return conn
+
+
+class SQLiteCursor:
+    """DictCursor look-alike; sqlite3 already steps through results lazily, so it also stands in for SSDictCursor"""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._raw = conn.cursor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    @property
+    def rowcount(self):
+        return self._raw.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._raw.lastrowid
+
+    @property
+    def description(self):
+        return self._raw.description
+
+    def execute(self, query, args=None):
+        statements = translate(query)
+        if args is not None:
+            statements = [_placeholders(sql) for sql in statements]
+        params = tuple(args) if args is not None else ()
+        for sql in statements:
+            self._raw.execute(sql, params)
+        return self._raw.rowcount
+
+    def executemany(self, query, args):
+        statements = translate(query)
+        for sql in statements:
+            self._raw.executemany(_placeholders(sql), [tuple(row) for row in args])
+        return self._raw.rowcount
+
+    def fetchone(self):
+        return self._raw.fetchone()
+
+    def fetchmany(self, size=None):
+        return self._raw.fetchmany(size if size is not None else self._raw.arraysize)
+
+    def fetchall(self):
+        return self._raw.fetchall()
+
+    def close(self):
+        self._raw.close()
+
+
+class SQLiteConnection:
+    """One SQLite connection in autocommit mode, like the PyMySQL connections of DB_CONFIG"""
+
+    def __init__(self, path, timeout=5, synchronous='NORMAL'):
+        self._conn = connect(path, timeout, synchronous, check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES)
+        self._conn.row_factory = _dict_row
+        self.open = True
+
+    @property
+    def in_transaction(self):
+        return self.open and self._conn.in_transaction
+
+    def cursor(self, cursorclass=None):
+        return SQLiteCursor(self._conn)
+
+    def begin(self):
+        # Seperti BEGIN di MySQL: transaksi yang masih terbuka di-commit dulu
+        if self._conn.in_transaction:
+            self._conn.execute("COMMIT")
+        self._conn.execute("BEGIN IMMEDIATE")
+
+    def commit(self):
+        if self._conn.in_transaction:
+            self._conn.execute("COMMIT")
+
+    def rollback(self):
+        if self._conn.in_transaction:
+            self._conn.execute("ROLLBACK")
+
+    def ping(self, reconnect=False):
+        self._conn.execute("SELECT 1").fetchone()
+
+    def close(self):
+        if self.open:
+            self.open = False
+            self._conn.close()
+
+
+class LocalDatabase:
+    """Per-thread connect() to one SQLite file; how the cache, session, waiting room, idempotency and job stores share state between workers"""
+
+    def __init__(self, path, timeout=5, synchronous='NORMAL'):
+        self.path = path
+        self.timeout = timeout
+        self.synchronous = synchronous
+        self._local = threading.local()
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = connect(self.path, self.timeout, self.synchronous)
+        return conn
+
+
+def instance_file(app, path):
+    """path as given if absolute, otherwise inside the app's instance folder (created when missing)"""
+    if os.path.isabs(path):
+        return path
+    os.makedirs(app.instance_path, exist_ok=True)
+    return os.path.join(app.instance_path, path)
@@ -0,0 +1,179 @@
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+import db_sqlite
+
+# Konfigurasi Idempotency (detik)
+IDEMPOTENCY_CONFIG = {
+    'backend': 'memory',        # 'memory' (per proses) atau 'sqlite' (dibagi antar worker)
+    'path': 'festix_idempotency.sqlite3',
+    'ttl': 3600,                # hasil submit disimpan selama ini; submit ulang sesudahnya dianggap baru
+    'pending_ttl': 60,          # klaim yang tidak pernah selesai (worker mati) bebas lagi setelah ini
+    'wait_timeout': 10,         # submit ganda menunggu hasil submit pertama paling lama sekian detik
+    'max_entries': 100000,      # batas jumlah kunci yang disimpan; yang paling lama habis dibuang dulu
+}
+
+PENDING = 'pending'
+DONE = 'done'
+
+
+class ResultStore:
+    """Interface every idempotency backend implements; results are JSON-serialisable values"""
+
+    def claim(self, key, now, pending_ttl):
+        """Mark key as in progress and return None, or return (state, result) if it is already known"""
+        raise NotImplementedError
+
+    def finish(self, key, result, expires_at):
+        raise NotImplementedError
+
+    def release(self, key):
+        """Forget key so the next submit runs again (the first attempt changed nothing)"""
+        raise NotImplementedError
+
+    def get(self, key, now):
+        """Return (state, result) or None"""
+        raise NotImplementedError
+
+
+class MemoryResultStore(ResultStore):
+    """Results held in this process; the least recently written keys are dropped beyond max_entries"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> (state, result, expires_at)
+        self._lock = threading.Lock()
+
+    def claim(self, key, now, pending_ttl):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[2] > now:
+                return item[0], item[1]
+            self._put(key, (PENDING, None, now + pending_ttl))
+            return None
+
+    def finish(self, key, result, expires_at):
+        with self._lock:
+            self._put(key, (DONE, result, expires_at))
+
+    def release(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def get(self, key, now):
+        with self._lock:
+            item = self._data.get(key)
+            return (item[0], item[1]) if item is not None and item[2] > now else None
+
+    def _put(self, key, item):
+        self._data[key] = item
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+
+class SQLiteResultStore(ResultStore):
+    """Results in a local SQLite file so a double submit that lands on another worker is caught too"""
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self._db = db_sqlite.LocalDatabase(path)
+        self._writes = 0
+        conn = self._db.connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS idempotency (
+                key TEXT PRIMARY KEY, state TEXT NOT NULL, result TEXT, expires_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency (expires_at)")
+
+    def claim(self, key, now, pending_ttl):
+        conn = self._db.connection()
+        # Hanya satu submit yang berhasil mengklaim: kunci baru, atau kunci lama yang sudah kedaluwarsa
+        claimed = conn.execute("""
+            INSERT INTO idempotency (key, state, result, expires_at) VALUES (?, ?, NULL, ?)
+            ON CONFLICT (key) DO UPDATE SET state = excluded.state, result = NULL, expires_at = excluded.expires_at
+            WHERE idempotency.expires_at <= ?
+        """, (key, PENDING, now + pending_ttl, now)).rowcount
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self._purge(conn, now)
+        if claimed:
+            return None
+        return self.get(key, now)
+
+    def finish(self, key, result, expires_at):
+        self._db.connection().execute("UPDATE idempotency SET state = ?, result = ?, expires_at = ? WHERE key = ?",
+                             (DONE, json.dumps(result), expires_at, key))
+
+    def release(self, key):
+        self._db.connection().execute("DELETE FROM idempotency WHERE key = ?", (key,))
+
+    def get(self, key, now):
+        row = self._db.connection().execute(
+            "SELECT state, result FROM idempotency WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]) if row[1] is not None else None
+
+    def _purge(self, conn, now):
+        conn.execute("DELETE FROM idempotency WHERE expires_at <= ?", (now,))
+        excess = conn.execute("SELECT COUNT(*) FROM idempotency").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute("DELETE FROM idempotency WHERE key IN (SELECT key FROM idempotency ORDER BY expires_at LIMIT ?)",
+                         (excess,))
+
+
+store = MemoryResultStore(IDEMPOTENCY_CONFIG['max_entries'])
+
+
+def new_token():
+    """One-time token for a form; the submit that carries it runs at most once"""
+    return secrets.token_urlsafe(16)
+
+
+def claim(key):
+    """Start the work for key: None for the first submit, otherwise the recorded result.
+
+    A duplicate that arrives while the first submit is still running waits for
+    its result; if that takes longer than wait_timeout, PENDING is returned.
+    """
+    deadline = time.monotonic() + IDEMPOTENCY_CONFIG['wait_timeout']
+    record = store.claim(key, time.time(), IDEMPOTENCY_CONFIG['pending_ttl'])
+    while record is not None and record[0] == PENDING:
+        if time.monotonic() >= deadline:
+            return PENDING
+        time.sleep(0.05)
+        record = store.get(key, time.time())
+        if record is None:
+            # Submit pertama dilepas (gagal tanpa efek) atau kedaluwarsa: submit ini yang jalan
+            record = store.claim(key, time.time(), IDEMPOTENCY_CONFIG['pending_ttl'])
+    return None if record is None else record[1]
+
+
+def finish(key, result):
+    """Record the outcome that every later submit with key gets back"""
+    store.finish(key, result, time.time() + IDEMPOTENCY_CONFIG['ttl'])
+
+
+def release(key):
+    store.release(key)
+
+
+def init_app(app):
+    """Read IDEMPOTENCY_BACKEND, IDEMPOTENCY_TTL, ... from app.config"""
+    global store
+    for key in IDEMPOTENCY_CONFIG:
+        config_key = f'IDEMPOTENCY_{key.upper()}'
+        if config_key in app.config:
+            IDEMPOTENCY_CONFIG[key] = app.config[config_key]
+    if IDEMPOTENCY_CONFIG['backend'] == 'sqlite':
+        path = db_sqlite.instance_file(app, IDEMPOTENCY_CONFIG['path'])
+        store = SQLiteResultStore(path, IDEMPOTENCY_CONFIG['max_entries'])
+    else:
+        store = MemoryResultStore(IDEMPOTENCY_CONFIG['max_entries'])
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import threading
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow opsional: tanpa Pillow poster asli tetap dipakai
+    Image = None
+
+# Ukuran turunan poster: lebar (px) untuk 1x dan 2x layar
+VARIANTS = {
+    'card': (400, 800),
+    'detail': (800, 1600),
+}
+JPEG_QUALITY = 80
+WEBP_QUALITY = 75
+VARIANTS_DIR = 'variants'
+MANIFEST_NAME = 'manifest.json'
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+class ImagePipeline:
+    """Generates resized, recompressed JPEG/WebP variants of the posters in static/img.
+
+    Files are named <stem>-<content hash>-<width>.<ext>, so a replaced poster gets
+    new URLs and old ones can be cached forever. manifest.json maps each source
+    file to its variants and is what the templates read.
+    """
+
+    def __init__(self, image_dir):
+        self.image_dir = image_dir
+        self.output_dir = os.path.join(image_dir, VARIANTS_DIR)
+        self.manifest_path = os.path.join(self.output_dir, MANIFEST_NAME)
+        self._manifest = None
+        self._manifest_mtime = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return Image is not None
+
+    def manifest(self):
+        """Current manifest, reloaded when another process rewrote it"""
+        try:
+            mtime = os.path.getmtime(self.manifest_path)
+        except OSError:
+            return {}
+        if self._manifest is None or mtime != self._manifest_mtime:
+            with open(self.manifest_path) as f:
+                self._manifest = json.load(f)
+            self._manifest_mtime = mtime
+        return self._manifest
+
+    def variants(self, filename, variant):
+        """{'jpg': [(width, 'img/variants/...'), ...], 'webp': [...]} or None if not processed (yet)"""
+        entry = self._current_entry(filename)
+        return entry['variants'].get(variant) if entry else None
+
+    def version(self, filename):
+        """Content hash of the variants templates get for filename, '' while they serve the original"""
+        entry = self._current_entry(filename)
+        return entry['hash'] if entry else ''
+
+    def _current_entry(self, filename):
+        entry = self.manifest().get(filename)
+        if not entry:
+            return None
+        # Poster diganti dengan nama yang sama: pakai aslinya sampai job membuat varian yang baru
+        if 'mtime' in entry:
+            try:
+                if os.path.getmtime(os.path.join(self.image_dir, filename)) != entry['mtime']:
+                    return None
+            except OSError:
+                return None
+        return entry
+
+    def process(self, filename):
+        """Build every variant of static/img/<filename>; returns False if skipped or failed"""
+        if not self.available or not filename or '/' in filename or '\\' in filename:
+            return False
+        if not filename.lower().endswith(SOURCE_EXTENSIONS):
+            return False
+        source = os.path.join(self.image_dir, filename)
+        if not os.path.isfile(source):
+            return False
+
+        mtime = os.path.getmtime(source)
+        with open(source, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()[:10]
+        with self._lock:
+            manifest = dict(self.manifest())
+            entry = manifest.get(filename)
+            if entry and entry['hash'] == digest and entry.get('mtime') == mtime and self._files_exist(entry):
+                return True
+            if entry and entry['hash'] == digest and self._files_exist(entry):
+                entry = dict(entry, mtime=mtime)  # isi sama, hanya disentuh ulang
+            else:
+                try:
+                    entry = self._render(source, filename, digest)
+                except Exception as e:
+                    print(f"Error processing image {filename}: {e}")
+                    return False
+                entry['mtime'] = mtime
+            manifest[filename] = entry
+            self._write_manifest(manifest)
+        return True
+
+    def process_all(self):
+        """Batch mode for posters that were uploaded before the pipeline existed"""
+        done = 0
+        for filename in sorted(os.listdir(self.image_dir)):
+            if os.path.isfile(os.path.join(self.image_dir, filename)) and self.process(filename):
+                done += 1
+        return done
+
+    def _render(self, source, filename, digest):
+        os.makedirs(self.output_dir, exist_ok=True)
+        stem = os.path.splitext(filename)[0]
+        entry = {'hash': digest, 'variants': {}}
+        rendered = set()  # widths already written; card and detail share some sizes
+        with Image.open(source) as original:
+            original = ImageOps.exif_transpose(original).convert('RGB')
+            for variant, widths in VARIANTS.items():
+                outputs = {'jpg': [], 'webp': []}
+                for width in widths:
+                    # Never upscale: a small poster just yields fewer, smaller variants
+                    width = min(width, original.width)
+                    if outputs['jpg'] and outputs['jpg'][-1][0] == width:
+                        continue
+                    if width not in rendered:
+                        height = round(original.height * width / original.width)
+                        rendered.add(width)
+                        resized = original.resize((width, height), Image.LANCZOS)
+                        for ext, fmt, options in (('jpg', 'JPEG', {'quality': JPEG_QUALITY, 'optimize': True, 'progressive': True}),
+                                                  ('webp', 'WEBP', {'quality': WEBP_QUALITY})):
+                            resized.save(os.path.join(self.output_dir, f"{stem}-{digest}-{width}.{ext}"), fmt, **options)
+                    for ext in ('jpg', 'webp'):
+                        outputs[ext].append((width, f"img/{VARIANTS_DIR}/{stem}-{digest}-{width}.{ext}"))
+                entry['variants'][variant] = outputs
+        return entry
+
+    def _files_exist(self, entry):
+        static_dir = os.path.dirname(self.image_dir)
+        return all(os.path.isfile(os.path.join(static_dir, path))
+                   for outputs in entry['variants'].values()
+                   for files in outputs.values()
+                   for _, path in files)
+
+    def _write_manifest(self, manifest):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+        self._manifest = manifest
+        self._manifest_mtime = os.path.getmtime(self.manifest_path)
+
+
+pipeline = None
+
+
+def init_app(app):
+    """Expose poster variants to templates and register `flask images build`"""
+    global pipeline
+    pipeline = ImagePipeline(os.path.join(app.static_folder, 'img'))
+
+    @app.context_processor
+    def inject_image_variants():
+        return {'image_variants': pipeline.variants, 'image_version': pipeline.version}
+
+    @app.cli.group('images')
+    def images_cli():
+        """Poster image pipeline."""
+
+    @images_cli.command('build')
+    def build():
+        """Generate variants for every poster in static/img."""
+        if not pipeline.available:
+            print('Pillow belum terpasang: pip install Pillow')
+            return
+        print(f'{pipeline.process_all()} gambar diproses.')
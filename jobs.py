@@ -0,0 +1,272 @@
+import json
+import random
+import threading
+import time
+
+import click
+
+import db_sqlite
+import metrics
+
+# Konfigurasi Job Queue (detik)
+JOBS_CONFIG = {
+    'path': 'festix_jobs.sqlite3',
+    'workers': 2,               # thread worker di proses web; 0 = hanya proses `flask jobs worker`
+    'max_attempts': 5,
+    'backoff_base': 5,          # percobaan ke-n gagal -> tunggu base * 2^(n-1), dengan jitter
+    'backoff_max': 600,
+    'lease': 120,               # job 'running' melewati batas ini dianggap ditinggal worker yang mati
+    'poll_interval': 1.0,
+    'retention': 7 * 86400,     # job yang selesai dihapus setelah sekian detik
+}
+
+_handlers = {}
+
+
+def task(name):
+    """Register the decorated function as the handler for jobs called name; payload items are its kwargs"""
+    def decorator(fn):
+        _handlers[name] = fn
+        return fn
+    return decorator
+
+
+class Job:
+    __slots__ = ('id', 'name', 'payload', 'attempts')
+
+    def __init__(self, id, name, payload, attempts):
+        self.id = id
+        self.name = name
+        self.payload = payload
+        self.attempts = attempts
+
+
+class JobQueue:
+    """Durable queue in a local SQLite file, shared by every web and worker process on the box.
+
+    Delivery is at least once: a job whose worker dies is claimed again after
+    its lease runs out, so handlers must tolerate running twice. Idempotency
+    keys make enqueueing the same work twice a no-op.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._db = db_sqlite.LocalDatabase(path)
+        self._finished = 0
+        conn = self._db.connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                idempotency_key TEXT UNIQUE,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                run_at REAL NOT NULL,
+                locked_until REAL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                finished_at REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_run_at ON jobs (status, run_at)")
+
+    def enqueue(self, name, payload, key=None, delay=0):
+        """Add a job; returns its id, or None when a job with the same key already exists"""
+        now = time.time()
+        cursor = self._db.connection().execute(
+            "INSERT INTO jobs (name, payload, idempotency_key, run_at, created_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (idempotency_key) DO NOTHING",
+            (name, json.dumps(payload), key, now + delay, now)
+        )
+        return cursor.lastrowid if cursor.rowcount else None
+
+    def claim(self, lease):
+        """Take the next due job (or one whose lease expired) and lease it; None when nothing is due"""
+        now = time.time()
+        row = self._db.connection().execute("""
+            UPDATE jobs SET status = 'running', attempts = attempts + 1, locked_until = ?
+            WHERE id = (
+                SELECT id FROM jobs
+                WHERE (status = 'queued' AND run_at <= ?) OR (status = 'running' AND locked_until <= ?)
+                ORDER BY run_at LIMIT 1
+            )
+            RETURNING id, name, payload, attempts
+        """, (now + lease, now, now)).fetchone()
+        return Job(row[0], row[1], json.loads(row[2]), row[3]) if row else None
+
+    def complete(self, job_id):
+        conn = self._db.connection()
+        now = time.time()
+        conn.execute("UPDATE jobs SET status = 'done', locked_until = NULL, finished_at = ? WHERE id = ?", (now, job_id))
+        self._finished += 1
+        if self._finished % 100 == 0:
+            conn.execute("DELETE FROM jobs WHERE status = 'done' AND finished_at < ?", (now - JOBS_CONFIG['retention'],))
+
+    def retry(self, job_id, error, delay):
+        self._db.connection().execute(
+            "UPDATE jobs SET status = 'queued', locked_until = NULL, last_error = ?, run_at = ? WHERE id = ?",
+            (error, time.time() + delay, job_id)
+        )
+
+    def fail(self, job_id, error):
+        self._db.connection().execute(
+            "UPDATE jobs SET status = 'failed', locked_until = NULL, last_error = ?, finished_at = ? WHERE id = ?",
+            (error, time.time(), job_id)
+        )
+
+    def requeue_failed(self):
+        """Give every failed job a fresh set of attempts; returns how many"""
+        return self._db.connection().execute(
+            "UPDATE jobs SET status = 'queued', attempts = 0, run_at = ?, finished_at = NULL WHERE status = 'failed'",
+            (time.time(),)
+        ).rowcount
+
+    def stats(self):
+        rows = self._db.connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def failed(self, limit=20):
+        return self._db.connection().execute(
+            "SELECT id, name, attempts, last_error FROM jobs WHERE status = 'failed' ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+
+
+def backoff(attempts):
+    """Seconds to wait before the next try after `attempts` failed ones"""
+    delay = min(JOBS_CONFIG['backoff_max'], JOBS_CONFIG['backoff_base'] * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)  # jitter: job yang gagal bersamaan tidak kembali bersamaan
+
+
+class Worker:
+    """Threads that claim and run jobs, each inside an app context"""
+
+    def __init__(self, app, queue, concurrency):
+        self.app = app
+        self.queue = queue
+        self.concurrency = concurrency
+        self._threads = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def ensure_running(self):
+        """Start the worker threads if they are not running yet"""
+        if len(self._threads) >= self.concurrency:
+            return
+        with self._lock:
+            while len(self._threads) < self.concurrency:
+                thread = threading.Thread(target=self._run, name=f'job-worker-{len(self._threads) + 1}', daemon=True)
+                self._threads.append(thread)
+                thread.start()
+
+    def notify(self):
+        """A job was enqueued in this process; wake a sleeping worker instead of waiting for the poll"""
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                ran = self.run_once()
+            except Exception as e:
+                print(f"Error claiming job: {e}")
+                ran = False
+            if not ran:
+                self._wake.wait(JOBS_CONFIG['poll_interval'])
+                self._wake.clear()
+
+    def run_once(self):
+        """Claim and run one job; returns False when the queue had nothing due"""
+        job = self.queue.claim(JOBS_CONFIG['lease'])
+        if job is None:
+            return False
+        handler = _handlers.get(job.name)
+        if handler is None:
+            self.queue.fail(job.id, f"tidak ada handler untuk job {job.name!r}")
+            metrics.jobs_total.inc(job.name, 'failed')
+            return True
+        if job.attempts > JOBS_CONFIG['max_attempts']:
+            # Lease habis berulang kali: worker-nya mati di tengah job ini
+            self.queue.fail(job.id, "lease habis terlalu sering")
+            metrics.jobs_total.inc(job.name, 'failed')
+            return True
+        start = time.perf_counter()
+        try:
+            with self.app.app_context():
+                handler(**job.payload)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if job.attempts >= JOBS_CONFIG['max_attempts']:
+                print(f"Job {job.name} #{job.id} gagal permanen: {error}")
+                self.queue.fail(job.id, error)
+                metrics.jobs_total.inc(job.name, 'failed')
+            else:
+                self.queue.retry(job.id, error, backoff(job.attempts))
+                metrics.jobs_total.inc(job.name, 'retried')
+        else:
+            self.queue.complete(job.id)
+            metrics.jobs_total.inc(job.name, 'done')
+        finally:
+            metrics.job_duration.observe(time.perf_counter() - start, job.name)
+        return True
+
+
+queue = None
+worker = None
+
+
+def enqueue(name, key=None, delay=0, **payload):
+    """Queue handler `name` with JSON-serialisable kwargs; returns the job id or None if key was seen before"""
+    job_id = queue.enqueue(name, payload, key=key, delay=delay)
+    if job_id is not None and worker is not None:
+        worker.notify()
+    return job_id
+
+
+def init_app(app):
+    """Open the queue (JOBS_PATH, JOBS_WORKERS, ...), start in-process workers lazily and add `flask jobs`"""
+    global queue, worker
+    for key in JOBS_CONFIG:
+        config_key = f'JOBS_{key.upper()}'
+        if config_key in app.config:
+            JOBS_CONFIG[key] = app.config[config_key]
+    path = db_sqlite.instance_file(app, JOBS_CONFIG['path'])
+    queue = JobQueue(path)
+    worker = Worker(app, queue, JOBS_CONFIG['workers'])
+    # Thread dimulai saat request pertama, bukan saat import (CLI tidak butuh worker)
+    app.before_request(worker.ensure_running)
+
+    @app.cli.group('jobs')
+    def jobs_cli():
+        """Background job queue."""
+
+    @jobs_cli.command('worker')
+    @click.option('--concurrency', default=2, show_default=True, help='jumlah thread worker')
+    def worker_command(concurrency):
+        """Run job workers in the foreground until interrupted."""
+        global worker
+        worker = Worker(app, queue, concurrency)
+        worker.ensure_running()
+        print(f'{concurrency} worker berjalan ({queue.path}). Ctrl+C untuk berhenti.')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            worker.stop()
+
+    @jobs_cli.command('status')
+    def status_command():
+        """Show job counts per status and the latest failures."""
+        for status, count in sorted(queue.stats().items()):
+            print(f'{status:<8} {count}')
+        for job_id, name, attempts, error in queue.failed():
+            print(f'  gagal #{job_id} {name} ({attempts}x): {error}')
+
+    @jobs_cli.command('retry-failed')
+    def retry_failed_command():
+        """Queue every failed job again."""
+        print(f'{queue.requeue_failed()} job dijadwalkan ulang.')
@@ -0,0 +1,174 @@
+import json
+import threading
+import time
+
+from models import Event
+
+# Konfigurasi Stok Live (detik)
+LIVE_STOCK_CONFIG = {
+    'interval': 1.0,            # satu query stok per interval untuk semua penonton di proses ini
+    'max_ids': 100,             # batas event per request JSON / stream
+    'heartbeat': 15,            # komentar SSE agar proxy tidak menutup koneksi yang diam
+    'max_stream': 300,          # stream ditutup setelah sekian detik; EventSource menyambung ulang sendiri
+    'retry_ms': 3000,           # jeda sambung ulang yang disarankan ke browser
+    # SSE menahan satu thread server per penonton, jadi hanya untuk event yang sedang diburu
+    'hot_events': (),           # event_id yang selalu di-stream (mis. saat on-sale dibuka)
+    'hot_stock': 50,            # ... dan event yang stoknya tinggal sekian atau kurang (0 = nonaktif)
+    'poll_interval': 15,        # event lain: browser memanggil /api/stok (bisa di-cache) tiap sekian detik
+}
+
+
+def parse_ids(value):
+    """'1,2,3' -> [1, 2, 3] (unique, in order, at most max_ids); raises ValueError on junk"""
+    ids = []
+    for part in (value or '').split(','):
+        part = part.strip()
+        if part:
+            event_id = int(part)
+            if event_id not in ids:
+                ids.append(event_id)
+    if len(ids) > LIVE_STOCK_CONFIG['max_ids']:
+        raise ValueError(f"at most {LIVE_STOCK_CONFIG['max_ids']} event ids")
+    return ids
+
+
+class StockPoller:
+    """One background thread reads stock for every watched event per tick and wakes the watchers.
+
+    However many streams are open, each tick costs a single
+    `SELECT id, stok ... WHERE id IN (...)` over the union of their event ids;
+    the thread sleeps while nobody is watching.
+    """
+
+    def __init__(self, fetch=Event.get_stock):
+        self._fetch = fetch
+        self._watchers = {}     # event_id -> number of open streams watching it
+        self._snapshot = {}     # event_id -> stok of the last tick
+        self._tick = 0
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def subscribe(self, event_ids):
+        with self._cond:
+            for event_id in event_ids:
+                self._watchers[event_id] = self._watchers.get(event_id, 0) + 1
+            self._cond.notify_all()
+        self.ensure_running()
+
+    def unsubscribe(self, event_ids):
+        with self._cond:
+            for event_id in event_ids:
+                count = self._watchers.get(event_id, 0) - 1
+                if count > 0:
+                    self._watchers[event_id] = count
+                else:
+                    self._watchers.pop(event_id, None)
+                    self._snapshot.pop(event_id, None)
+
+    def ensure_running(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='stock-poller', daemon=True)
+            self._thread.start()
+
+    def cached(self, event_ids):
+        """Stock from the last tick if every id is being watched (at most one interval old), else None"""
+        with self._cond:
+            if all(event_id in self._snapshot for event_id in event_ids):
+                return {event_id: self._snapshot[event_id] for event_id in event_ids}
+        return None
+
+    def wait(self, last_tick, timeout):
+        """Block until a tick newer than last_tick; returns (tick, snapshot copy)"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._tick != last_tick, timeout)
+            return self._tick, dict(self._snapshot)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._watchers)
+                event_ids = list(self._watchers)
+            started = time.monotonic()
+            try:
+                stock = self._fetch(event_ids)
+            except Exception as e:
+                print(f"Error polling stock: {e}")
+                stock = None
+            if stock is not None:
+                with self._cond:
+                    # Id yang ditinggal semua penonton selama query berjalan tidak disimpan (akan basi);
+                    # event yang dihapus tidak ada di hasil query dan keluar dari snapshot
+                    for event_id in event_ids:
+                        if event_id in stock and event_id in self._watchers:
+                            self._snapshot[event_id] = stock[event_id]
+                        else:
+                            self._snapshot.pop(event_id, None)
+                    self._tick += 1
+                    self._cond.notify_all()
+            time.sleep(max(0.0, LIVE_STOCK_CONFIG['interval'] - (time.monotonic() - started)))
+
+
+poller = StockPoller()
+
+
+def current(event_ids):
+    """{event_id: stok} of the events that exist, from the poller when it already watches every id, otherwise one query"""
+    stock = poller.cached(event_ids)
+    if stock is None:
+        stock = Event.get_stock(event_ids)
+    return {event_id: stock[event_id] for event_id in event_ids if event_id in stock}
+
+
+def is_hot(event):
+    """True when event's page should stream stock over SSE instead of polling /api/stok"""
+    hot_stock = LIVE_STOCK_CONFIG['hot_stock']
+    return event.id in LIVE_STOCK_CONFIG['hot_events'] or 0 < event.stok <= hot_stock
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream(event_ids, initial):
+    """SSE messages for event_ids: the initial stock (from current()), then only the values that changed.
+
+    Each open stream holds a server thread while it waits, so long-lived
+    streams want a threaded or gevent worker; max_stream bounds how long.
+    """
+    poller.subscribe(event_ids)
+    try:
+        sent = dict(initial)
+        yield f"retry: {LIVE_STOCK_CONFIG['retry_ms']}\n" + _sse('stok', {str(k): v for k, v in sent.items()})
+        deadline = time.monotonic() + LIVE_STOCK_CONFIG['max_stream']
+        last_message = time.monotonic()
+        tick = None
+        while time.monotonic() < deadline:
+            tick, snapshot = poller.wait(tick, LIVE_STOCK_CONFIG['heartbeat'])
+            changed = {str(event_id): snapshot[event_id] for event_id in event_ids
+                       if event_id in snapshot and snapshot[event_id] != sent.get(event_id)}
+            if changed:
+                sent.update({int(event_id): stok for event_id, stok in changed.items()})
+                yield _sse('stok', changed)
+                last_message = time.monotonic()
+            elif time.monotonic() - last_message >= LIVE_STOCK_CONFIG['heartbeat']:
+                yield ": ping\n\n"
+                last_message = time.monotonic()
+    finally:
+        poller.unsubscribe(event_ids)
+
+
+def init_app(app):
+    """Read LIVE_STOCK_INTERVAL, LIVE_STOCK_HOT_EVENTS, ... from app.config and expose stok_hot() to templates"""
+    for key in LIVE_STOCK_CONFIG:
+        config_key = f'LIVE_STOCK_{key.upper()}'
+        if config_key in app.config:
+            LIVE_STOCK_CONFIG[key] = app.config[config_key]
+    LIVE_STOCK_CONFIG['hot_events'] = frozenset(LIVE_STOCK_CONFIG['hot_events'] or ())
+
+    @app.context_processor
+    def inject_live_stock():
+        return {'stok_hot': is_hot, 'stok_poll_ms': int(LIVE_STOCK_CONFIG['poll_interval'] * 1000)}
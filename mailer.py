@@ -0,0 +1,54 @@
+import os
+import smtplib
+import time
+from email.message import EmailMessage
+
+# Konfigurasi Email
+MAIL_CONFIG = {
+    'backend': 'file',          # 'file' (tulis .eml ke outbox, pengganti SMTP lokal) atau 'smtp'
+    'outbox': 'outbox',         # folder untuk backend 'file', relatif ke instance folder
+    'sender': 'FesTix <no-reply@festix.local>',
+    'smtp_host': 'localhost',
+    'smtp_port': 1025,          # mis. MailHog/Mailpit saat development
+    'smtp_user': None,
+    'smtp_password': None,
+    'smtp_starttls': False,
+    'smtp_timeout': 10,
+}
+
+
+def build_message(to, subject, body):
+    message = EmailMessage()
+    message['From'] = MAIL_CONFIG['sender']
+    message['To'] = to
+    message['Subject'] = subject
+    message.set_content(body)
+    return message
+
+
+def send(to, subject, body):
+    """Deliver one plain-text email through the configured backend; raises on failure so the job is retried"""
+    message = build_message(to, subject, body)
+    if MAIL_CONFIG['backend'] == 'smtp':
+        with smtplib.SMTP(MAIL_CONFIG['smtp_host'], MAIL_CONFIG['smtp_port'], timeout=MAIL_CONFIG['smtp_timeout']) as smtp:
+            if MAIL_CONFIG['smtp_starttls']:
+                smtp.starttls()
+            if MAIL_CONFIG['smtp_user']:
+                smtp.login(MAIL_CONFIG['smtp_user'], MAIL_CONFIG['smtp_password'])
+            smtp.send_message(message)
+        return None
+    os.makedirs(MAIL_CONFIG['outbox'], exist_ok=True)
+    path = os.path.join(MAIL_CONFIG['outbox'], f"{time.time_ns()}.eml")
+    with open(path, 'wb') as f:
+        f.write(message.as_bytes())
+    return path
+
+
+def init_app(app):
+    """Read MAIL_BACKEND, MAIL_SMTP_HOST, ... from app.config"""
+    for key in MAIL_CONFIG:
+        config_key = f'MAIL_{key.upper()}'
+        if config_key in app.config:
+            MAIL_CONFIG[key] = app.config[config_key]
+    if not os.path.isabs(MAIL_CONFIG['outbox']):
+        MAIL_CONFIG['outbox'] = os.path.join(app.instance_path, MAIL_CONFIG['outbox'])
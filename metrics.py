@@ -0,0 +1,197 @@
+import bisect
+import logging
+import sys
+import threading
+import time
+
+from flask import Response, g, has_request_context, request
+
+import db
+
+# Konfigurasi Metrics
+METRICS_CONFIG = {
+    'enabled': True,
+    'slow_query_ms': 100,       # query lebih lambat dari ini dicatat ke log beserta SQL-nya
+    'debug_header': None,       # None = ikut app.debug; True/False untuk memaksa header Server-Timing
+}
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+slow_query_log = logging.getLogger('festix.slow_query')
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a label tuple, in Prometheus layout"""
+
+    def __init__(self, name, help_text, label_names, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+        for labels, series in items:
+            base = _labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{_braced(base)} {series[-2]}")
+            lines.append(f"{self.name}_count{_braced(base)} {series[-1]}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by a label tuple"""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_braced(_labels(self.label_names, labels))} {value}")
+        return lines
+
+
+def _braced(label_text):
+    return f"{{{label_text}}}" if label_text else ""
+
+
+def _labels(names, values):
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ') for v in values)
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+
+request_duration = Histogram('festix_request_duration_seconds', 'Time spent handling a request', ('endpoint',))
+requests_total = Counter('festix_requests_total', 'Requests handled', ('endpoint', 'status'))
+request_queries = Histogram('festix_request_db_queries', 'DB queries issued per request', ('endpoint',), COUNT_BUCKETS)
+query_duration = Histogram('festix_db_query_duration_seconds', 'Duration of a single DB query', ('caller',))
+slow_queries_total = Counter('festix_db_slow_queries_total', 'Queries slower than the slow query threshold', ('caller',))
+connections_total = Counter('festix_db_connections_acquired_total', 'Connections borrowed from the pool', ())
+password_hash_duration = Histogram('festix_password_hash_seconds', 'Time spent computing one password hash or verification', ('op',))
+password_hash_wait = Histogram('festix_password_hash_queue_seconds', 'Time a hash job waited for a worker', ('op',))
+login_rejections_total = Counter('festix_login_rejections_total', 'Logins refused before checking the password', ('reason',))
+jobs_total = Counter('festix_jobs_total', 'Background jobs run, by outcome', ('job', 'outcome'))
+job_duration = Histogram('festix_job_duration_seconds', 'Time spent running one background job', ('job',))
+
+ALL_METRICS = (request_duration, requests_total, request_queries, query_duration, slow_queries_total, connections_total,
+               password_hash_duration, password_hash_wait, login_rejections_total, jobs_total, job_duration)
+
+
+def _caller():
+    """Name of the model method that issued the query, e.g. 'Event._fetch_all'"""
+    frame = sys._getframe(3)
+    for _ in range(8):
+        if frame is None:
+            break
+        if frame.f_code.co_filename.endswith('models.py'):
+            return getattr(frame.f_code, 'co_qualname', frame.f_code.co_name)
+        frame = frame.f_back
+    return 'other'
+
+
+def _on_query(sql, seconds):
+    caller = _caller()
+    query_duration.observe(seconds, caller)
+    if has_request_context():
+        stats = g.setdefault('_metrics', {'queries': 0, 'db_time': 0.0, 'connections': 0})
+        stats['queries'] += 1
+        stats['db_time'] += seconds
+    if seconds * 1000 >= METRICS_CONFIG['slow_query_ms']:
+        slow_queries_total.inc(caller)
+        slow_query_log.warning("Slow query (%.1f ms) in %s: %s", seconds * 1000, caller, ' '.join(sql.split()))
+
+
+def _on_acquire(pool):
+    connections_total.inc()
+    if has_request_context():
+        stats = g.setdefault('_metrics', {'queries': 0, 'db_time': 0.0, 'connections': 0})
+        stats['connections'] += 1
+
+
+def _start_timer():
+    g._metrics_start = time.perf_counter()
+
+
+def _record_request(response):
+    start = g.pop('_metrics_start', None)
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    endpoint = request.endpoint or 'unknown'
+    stats = g.get('_metrics', {'queries': 0, 'db_time': 0.0, 'connections': 0})
+    request_duration.observe(elapsed, endpoint)
+    requests_total.inc(endpoint, response.status_code)
+    request_queries.observe(stats['queries'], endpoint)
+
+    show_header = METRICS_CONFIG['debug_header']
+    if show_header is None:
+        from flask import current_app
+        show_header = current_app.debug
+    if show_header:
+        response.headers['Server-Timing'] = (
+            f'db;dur={stats["db_time"] * 1000:.1f};desc="{stats["queries"]} queries, {stats["connections"]} conn", '
+            f'app;dur={elapsed * 1000:.1f}'
+        )
+        response.headers['X-DB-Queries'] = str(stats['queries'])
+    return response
+
+
+def render_prometheus():
+    """All metrics in Prometheus text exposition format"""
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.expose())
+    status = db.pool.status()
+    lines.append("# HELP festix_db_pool_connections Connections currently held by the pool")
+    lines.append("# TYPE festix_db_pool_connections gauge")
+    lines.append(f'festix_db_pool_connections{{state="idle"}} {status["idle"]}')
+    lines.append(f'festix_db_pool_connections{{state="checked_out"}} {status["checked_out"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app):
+    """Hook request timing and DB listeners into the app and expose /metrics"""
+    for key in METRICS_CONFIG:
+        config_key = f'METRICS_{key.upper()}'
+        if config_key in app.config:
+            METRICS_CONFIG[key] = app.config[config_key]
+    if not METRICS_CONFIG['enabled']:
+        return
+    db.listen('query', _on_query)
+    db.listen('acquire', _on_acquire)
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
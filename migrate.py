@@ -0,0 +1,280 @@
+import datetime
+import os
+import re
+
+import click
+import pymysql
+
+import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+_FILENAME_RE = re.compile(r'^(\d{4})_(\w+)\.sql$')
+
+# Objek yang sudah ada (database lama yang dibuat manual): statement dilewati, bukan gagal
+ALREADY_EXISTS_ERRORS = {
+    1050,  # table already exists
+    1060,  # duplicate column name
+    1061,  # duplicate key name
+    1826,  # duplicate foreign key constraint name
+    3822,  # duplicate check constraint name
+}
+
+
+# Konfigurasi Migrasi
+MIGRATE_CONFIG = {
+    'require_current': True,    # tolak request selama ada migrasi yang belum dijalankan
+}
+
+
+class SchemaOutdated(RuntimeError):
+    """Raised when the database lacks migrations the code depends on"""
+
+
+class Migration:
+    __slots__ = ('version', 'name', 'path')
+
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+
+    def statements(self):
+        """SQL statements of the file; ';' at the end of a line ends a statement, '--' lines are comments"""
+        with open(self.path, encoding='utf-8') as f:
+            lines = [line for line in f if not line.lstrip().startswith('--')]
+        return [sql.strip() for sql in re.split(r';\s*$', ''.join(lines), flags=re.M) if sql.strip()]
+
+
+def discover():
+    """Every migration in MIGRATIONS_DIR, ordered by version"""
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = _FILENAME_RE.match(filename)
+        if match:
+            migrations.append(Migration(match.group(1), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    return migrations
+
+
+def _ensure_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(20) PRIMARY KEY,
+            name VARCHAR(200) NOT NULL,
+            applied_at DATETIME NOT NULL
+        )
+    """)
+
+
+def applied_versions():
+    """Versions recorded in schema_migrations; read-only, a database without the table has none"""
+    conn = db.get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SHOW TABLES LIKE 'schema_migrations'")
+            if cursor.fetchone() is None:
+                return set()
+            cursor.execute("SELECT version FROM schema_migrations")
+            return {row['version'] for row in cursor.fetchall()}
+    finally:
+        conn.close()
+
+
+def pending():
+    applied = applied_versions()
+    return [m for m in discover() if m.version not in applied]
+
+
+def require_current():
+    """Raise SchemaOutdated unless every migration has been applied"""
+    missing = pending()
+    if missing:
+        names = ', '.join(f'{m.version}_{m.name}' for m in missing)
+        raise SchemaOutdated(f"Database schema is behind ({names}); run `flask db upgrade`")
+
+
+def upgrade(target=None, echo=print):
+    """Apply pending migrations up to and including target (all when None); returns how many ran.
+
+    The files are written for MySQL (db_sqlite translates them for SQLite).
+    MySQL commits DDL implicitly, so a migration is recorded only after all of
+    its statements succeeded; a failed one can be fixed and re-run because
+    statements that find their object already present are skipped.
+    """
+    done = 0
+    conn = db.get_connection()
+    try:
+        with conn.cursor() as cursor:
+            _ensure_table(cursor)
+            for migration in pending():
+                if target is not None and migration.version > target:
+                    break
+                echo(f"Menjalankan {migration.version}_{migration.name} ...")
+                for sql in migration.statements():
+                    try:
+                        cursor.execute(sql)
+                    except pymysql.err.MySQLError as e:
+                        if e.args and e.args[0] in ALREADY_EXISTS_ERRORS:
+                            echo(f"  dilewati (sudah ada): {e.args[1]}")
+                            continue
+                        raise
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, name, applied_at) VALUES (%s, %s, %s)",
+                    (migration.version, migration.name, datetime.datetime.now().replace(microsecond=0))
+                )
+                conn.commit()
+                done += 1
+    finally:
+        conn.close()
+    return done
+
+
+# --- Pemeriksaan rencana query ---
+
+def _hot_queries(sample):
+    """(label, callable, full scan expected) for the read paths that run on every page view"""
+    from models import User, Event, Transaction, StockHold, SalesSummary, SalesRollup
+
+    today = datetime.date.today()
+    cursor = f"{today.isoformat()}_{sample['event_id']}"
+    midnight = datetime.datetime.combine(today, datetime.time())
+    return [
+        ('User.find_by_email', lambda: User.find_by_email(sample['email']), False),
+        ('User.get_by_id', lambda: User.get_by_id(sample['user_id']), False),
+        ('Event.get_page', lambda: Event._fetch_page(12, None, None, False, 'card'), False),
+        ('Event.get_page (upcoming)', lambda: Event._fetch_page(12, None, None, True, 'card'), False),
+        ('Event.get_page (after)', lambda: Event._fetch_page(12, cursor, None, False, 'card'), False),
+        ('Event.get_page (before)', lambda: Event._fetch_page(12, None, cursor, False, 'card'), False),
+        ('Event.get_by_id', lambda: Event._fetch_by_id(sample['event_id']), False),
+        ('Event.get_by_ids', lambda: Event.get_by_ids([sample['event_id']], 'card'), False),
+        ('Event.get_stock', lambda: Event.get_stock([sample['event_id']]), False),
+        ('Event.get_all', lambda: Event._fetch_all('row'), True),
+        ('Event._fetch_search_documents', Event._fetch_search_documents, True),
+        ('Transaction.get_by_user_id', lambda: Transaction.get_by_user_id(sample['user_id']), False),
+        ('Transaction.get_page', lambda: Transaction.get_page(20), False),
+        ('Transaction.get_page (event)', lambda: Transaction.get_page(20, event_id=sample['event_id']), False),
+        ('Transaction.get_page (tanggal)', lambda: Transaction.get_page(20, date_from=today, date_to=today), False),
+        ('StockHold.get_expired_ids', lambda: StockHold.get_expired_ids(datetime.datetime.now()), False),
+        ('SalesSummary.get', lambda: SalesSummary.get(sample['event_id']), False),
+        ('SalesSummary.get_by_event', SalesSummary.get_by_event, True),
+        ('SalesRollup.get_series', lambda: SalesRollup.get_series(sample['event_id'], 'hour', midnight), False),
+        ('SalesRollup.get_recent_tickets', lambda: SalesRollup.get_recent_tickets(midnight), False),
+    ]
+
+
+def _sample_ids():
+    conn = db.get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT id, email FROM users ORDER BY id LIMIT 1")
+            user = cursor.fetchone() or {'id': 1, 'email': 'check@festix.test'}
+            cursor.execute("SELECT id FROM events ORDER BY id LIMIT 1")
+            event = cursor.fetchone() or {'id': 1}
+    finally:
+        conn.close()
+    return {'user_id': user['id'], 'email': user['email'], 'event_id': event['id']}
+
+
+_EXPLAIN = {'mysql': "EXPLAIN ", 'sqlite': "EXPLAIN QUERY PLAN "}
+_SQLITE_FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+( AS \w+)?$')
+
+
+def _plan_step(row, ordered_limit=False):
+    """(full scan, sort without index, description) of one EXPLAIN row of either backend.
+
+    SQLite prints a rowid-order walk that stops at LIMIT as a bare "SCAN t" too
+    (MySQL: type=index); ordered_limit says the plan sorts nothing, so it is not flagged.
+    """
+    if 'detail' in row:
+        detail = row['detail']
+        full_scan = bool(_SQLITE_FULL_SCAN.match(detail)) and not ordered_limit
+        return full_scan, 'TEMP B-TREE FOR ORDER BY' in detail, detail
+    extra = row.get('Extra') or ''
+    description = (f"table={row.get('table')} type={row.get('type')} "
+                   f"key={row.get('key')} rows={row.get('rows')} {extra}")
+    return row.get('type') == 'ALL', 'Using filesort' in extra, description
+
+
+def check(echo=print):
+    """EXPLAIN every statement the hot read paths issue; returns the number of unexpected full scans"""
+    statements = []
+    capture = lambda sql, args: statements.append((sql, args))
+    problems = 0
+    sample = _sample_ids()
+    for label, call, scan_expected in _hot_queries(sample):
+        statements.clear()
+        db.listen('statement', capture)
+        try:
+            result = call()
+        finally:
+            db.unlisten('statement', capture)
+        if hasattr(result, 'close'):
+            result.close()
+        for sql, args in [s for s in statements if s[0].lstrip().upper().startswith('SELECT')]:
+            conn = db.get_connection()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(_EXPLAIN[db.DB_BACKEND] + sql, args)
+                    plan = cursor.fetchall()
+            finally:
+                conn.close()
+            ordered_limit = re.search(r'\bLIMIT\b', sql, re.I) and not any(
+                'TEMP B-TREE' in row.get('detail', '') for row in plan)
+            for full_scan, filesort, description in (_plan_step(row, ordered_limit) for row in plan):
+                flagged = full_scan and not scan_expected
+                status = 'FULL SCAN' if flagged else ('scan (wajar)' if full_scan else 'ok')
+                echo(f"{status:<13} {label:<32} {description}".rstrip())
+                if flagged:
+                    problems += 1
+                elif filesort and not scan_expected:
+                    echo(f"{'':<13} {'':<32} ^ sort tanpa index")
+    return problems
+
+
+_schema_current = False
+
+
+def _check_schema():
+    # Sekali per proses: tabel yang belum ada gagal di sini dengan pesan jelas, bukan di tengah checkout
+    global _schema_current
+    if _schema_current or not MIGRATE_CONFIG['require_current']:
+        return
+    require_current()
+    _schema_current = True
+
+
+def init_app(app):
+    """Refuse requests while the schema is behind (MIGRATE_REQUIRE_CURRENT) and register `flask db ...`"""
+    for key in MIGRATE_CONFIG:
+        config_key = f'MIGRATE_{key.upper()}'
+        if config_key in app.config:
+            MIGRATE_CONFIG[key] = app.config[config_key]
+    # Paling depan: hook lain (session, sweeper hold) sudah memakai tabel yang mungkin belum ada
+    app.before_request_funcs.setdefault(None, []).insert(0, _check_schema)
+
+    @app.cli.group('db')
+    def db_cli():
+        """Schema migrations and query plan checks."""
+
+    @db_cli.command('upgrade')
+    @click.option('--to', 'target', help='berhenti setelah versi ini (mis. 0002)')
+    def upgrade_command(target):
+        """Apply pending migrations."""
+        count = upgrade(target)
+        print(f'{count} migrasi dijalankan.' if count else 'Skema sudah terbaru.')
+
+    @db_cli.command('status')
+    def status_command():
+        """List migrations and whether they have been applied."""
+        applied = applied_versions()
+        for migration in discover():
+            mark = 'x' if migration.version in applied else ' '
+            print(f'[{mark}] {migration.version}_{migration.name}')
+
+    @db_cli.command('check')
+    def check_command():
+        """EXPLAIN the model queries and flag full table scans."""
+        problems = check()
+        if problems:
+            print(f'{problems} query melakukan full table scan. Jalankan `flask db upgrade`?')
+            raise SystemExit(1)
+        print('Semua query memakai index.')
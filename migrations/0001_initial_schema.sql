@@ -0,0 +1,34 @@
+-- Tabel inti FesTix. IF NOT EXISTS: database lama yang dibuat manual tetap bisa diadopsi.
+CREATE TABLE IF NOT EXISTS users (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    nama_lengkap VARCHAR(100) NOT NULL,
+    email VARCHAR(100) NOT NULL,
+    password VARCHAR(255) NOT NULL,
+    role ENUM('admin', 'member') NOT NULL DEFAULT 'member',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_users_email (email)
+);
+
+CREATE TABLE IF NOT EXISTS events (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    nama_event VARCHAR(150) NOT NULL,
+    tanggal DATE NOT NULL,
+    lokasi VARCHAR(150) NOT NULL,
+    harga DECIMAL(12, 2) NOT NULL,
+    stok INT NOT NULL,
+    deskripsi TEXT,
+    gambar VARCHAR(255)
+);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    event_id INT NOT NULL,
+    jumlah_tiket INT NOT NULL,
+    total_bayar DECIMAL(15, 2) NOT NULL,
+    nama_pemesan VARCHAR(100),
+    email_pemesan VARCHAR(100),
+    no_telepon VARCHAR(20),
+    catatan TEXT,
+    tanggal_transaksi TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,22 @@
+-- Index untuk query yang paling sering jalan (lihat `flask db check`).
+-- Index yang sudah ada dengan nama sama dilewati oleh migrate.py.
+
+-- User.find_by_email (login)
+ALTER TABLE users ADD UNIQUE KEY uq_users_email (email);
+
+-- Event.get_page: keyset (tanggal, id), juga filter upcoming_only
+ALTER TABLE events ADD INDEX idx_events_tanggal_id (tanggal, id);
+
+-- Transaction.get_by_user_id: WHERE user_id ORDER BY tanggal_transaksi
+ALTER TABLE transactions ADD INDEX idx_transactions_user_tanggal (user_id, tanggal_transaksi);
+
+-- Dashboard/laporan per event dan SalesSummary.rebuild (GROUP BY event_id)
+ALTER TABLE transactions ADD INDEX idx_transactions_event (event_id, id);
+
+-- Filter rentang tanggal di dashboard dan laporan keuangan
+ALTER TABLE transactions ADD INDEX idx_transactions_tanggal (tanggal_transaksi);
+
+-- Penjagaan terakhir terhadap oversell dan data impor yang salah (ditegakkan MySQL >= 8.0.16)
+ALTER TABLE events ADD CONSTRAINT chk_events_stok CHECK (stok >= 0);
+ALTER TABLE events ADD CONSTRAINT chk_events_harga CHECK (harga >= 0);
+ALTER TABLE transactions ADD CONSTRAINT chk_transactions_jumlah CHECK (jumlah_tiket > 0);
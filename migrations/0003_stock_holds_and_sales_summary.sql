@@ -0,0 +1,21 @@
+-- Tabel yang sebelumnya hanya dibuat saat dipakai (StockHold/SalesSummary.ensure_ready)
+CREATE TABLE IF NOT EXISTS stock_holds (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    event_id INT NOT NULL,
+    user_id INT NOT NULL,
+    jumlah_tiket INT NOT NULL,
+    expires_at DATETIME NOT NULL,
+    INDEX idx_stock_holds_expires_at (expires_at),
+    INDEX idx_stock_holds_user_event (user_id, event_id)
+);
+
+CREATE TABLE IF NOT EXISTS sales_summary (
+    event_id INT PRIMARY KEY,
+    total_penjualan DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    total_tiket INT NOT NULL DEFAULT 0
+);
+
+-- Isi ulang dari transactions agar database yang sudah berjalan langsung punya total yang benar
+INSERT INTO sales_summary (event_id, total_penjualan, total_tiket)
+SELECT event_id, SUM(total_bayar), SUM(jumlah_tiket) FROM transactions GROUP BY event_id
+ON DUPLICATE KEY UPDATE total_penjualan = VALUES(total_penjualan), total_tiket = VALUES(total_tiket);
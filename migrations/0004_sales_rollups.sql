@@ -0,0 +1,12 @@
+-- Penjualan per event per jam/hari, diperbarui di transaksi pembelian (lihat SalesRollup).
+-- Data lama diisi dengan `flask analytics backfill` setelah migrasi ini.
+CREATE TABLE IF NOT EXISTS sales_rollups (
+    event_id INT NOT NULL,
+    granularity ENUM('hour', 'day') NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    total_tiket INT NOT NULL DEFAULT 0,
+    total_penjualan DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    jumlah_transaksi INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (event_id, granularity, bucket_start),
+    INDEX idx_sales_rollups_bucket (granularity, bucket_start)
+);
@@ -1,17 +1,41 @@
+import datetime
 import pymysql
-from werkzeug.security import generate_password_hash, check_password_hash
+import auth
+import db
+import cache
+import search
+import sessions
 
-# Konfigurasi Database
+# Koneksi diambil dari pool (lihat db.py); close() mengembalikannya ke pool
 def get_db_connection():
-    return pymysql.connect(
-        host='localhost',
-        user='root',
-        password='',
-        database='FesTix_db',
-        cursorclass=pymysql.cursors.DictCursor
-    )
-
-class User:
+    return db.get_connection()
+
+# Cursor unbuffered memakai koneksinya sendiri: koneksi request tidak bisa menjalankan
+# query lain sampai seluruh hasilnya habis dibaca
+def get_streaming_connection():
+    return db.pool.acquire()
+
+class Record:
+    """Base for the row-backed models: fixed attributes through __slots__ and one shared row mapper"""
+    __slots__ = ()
+
+    @classmethod
+    def from_row(cls, row):
+        """Build an instance from a DictCursor row; columns that were not selected stay None"""
+        obj = cls.__new__(cls)
+        for name in cls.__slots__:
+            setattr(obj, name, row.get(name))
+        return obj
+
+    @classmethod
+    def from_rows(cls, rows):
+        return [cls.from_row(row) for row in rows]
+
+
+class User(Record):
+    __slots__ = ('id', 'nama_lengkap', 'email', 'password', 'role', 'created_at')
+    COLUMNS = ', '.join(__slots__)
+
     def __init__(self, id=None, nama_lengkap=None, email=None, password=None, role=None, created_at=None):
         self.id = id
         self.nama_lengkap = nama_lengkap
@@ -22,8 +46,8 @@ class User:
 
     @staticmethod
     def create(nama_lengkap, email, password):
-        """Create a new user with hashed password"""
-        hashed_pw = generate_password_hash(password)
+        """Create a new user with hashed password (raises auth.HasherBusy under load)"""
+        hashed_pw = auth.hash_password(password)
         conn = get_db_connection()
         try:
             with conn.cursor() as cursor:
@@ -43,28 +67,45 @@ class User:
         conn = get_db_connection()
         try:
             with conn.cursor() as cursor:
-                cursor.execute("SELECT * FROM users WHERE email = %s", (email,))
+                cursor.execute(f"SELECT {User.COLUMNS} FROM users WHERE email = %s", (email,))
                 user_data = cursor.fetchone()
-                if user_data:
-                    return User(
-                        id=user_data['id'],
-                        nama_lengkap=user_data['nama_lengkap'],
-                        email=user_data['email'],
-                        password=user_data['password'],
-                        role=user_data['role'],
-                        created_at=user_data['created_at']
-                    )
-                return None
+                return User.from_row(user_data) if user_data else None
         finally:
             conn.close()
 
     @staticmethod
     def authenticate(email, password):
-        """Authenticate user by email and password"""
+        """Authenticate user by email and password.
+
+        Verification runs on the auth worker pool (raises auth.HasherBusy when it
+        is saturated); a hash made with outdated parameters is upgraded in place.
+        """
         user = User.find_by_email(email)
-        if user and check_password_hash(user.password, password):
-            return user
-        return None
+        if not auth.verify_password(user.password if user else None, password):
+            return None
+        if auth.needs_rehash(user.password):
+            try:
+                new_hash = auth.hash_password(password)
+            except auth.HasherBusy:
+                return user  # coba lagi pada login berikutnya
+            if User.update_password_hash(user.id, new_hash):
+                user.password = new_hash
+        return user
+
+    @staticmethod
+    def update_password_hash(user_id, pwhash):
+        """Store a new password hash for a user"""
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("UPDATE users SET password = %s WHERE id = %s", (pwhash, user_id))
+            conn.commit()
+            return True
+        except Exception as e:
+            print(f"Error updating password hash: {e}")
+            return False
+        finally:
+            conn.close()
 
     @staticmethod
     def get_by_id(user_id):
@@ -72,18 +113,9 @@ class User:
         conn = get_db_connection()
         try:
             with conn.cursor() as cursor:
-                cursor.execute("SELECT * FROM users WHERE id = %s", (user_id,))
+                cursor.execute(f"SELECT {User.COLUMNS} FROM users WHERE id = %s", (user_id,))
                 user_data = cursor.fetchone()
-                if user_data:
-                    return User(
-                        id=user_data['id'],
-                        nama_lengkap=user_data['nama_lengkap'],
-                        email=user_data['email'],
-                        password=user_data['password'],
-                        role=user_data['role'],
-                        created_at=user_data['created_at']
-                    )
-                return None
+                return User.from_row(user_data) if user_data else None
         finally:
             conn.close()
 
@@ -93,19 +125,8 @@ class User:
         conn = get_db_connection()
         try:
             with conn.cursor() as cursor:
-                cursor.execute("SELECT * FROM users")
-                users_data = cursor.fetchall()
-                users = []
-                for user_data in users_data:
-                    users.append(User(
-                        id=user_data['id'],
-                        nama_lengkap=user_data['nama_lengkap'],
-                        email=user_data['email'],
-                        password=user_data['password'],
-                        role=user_data['role'],
-                        created_at=user_data['created_at']
-                    ))
-                return users
+                cursor.execute(f"SELECT {User.COLUMNS} FROM users")
+                return User.from_rows(cursor.fetchall())
         finally:
             conn.close()
 
@@ -117,6 +138,7 @@ class User:
             with conn.cursor() as cursor:
                 cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
             conn.commit()
+            sessions.revoke_user(user_id)
             return True
         except Exception as e:
             print(f"Error deleting user: {e}")
@@ -125,7 +147,42 @@ class User:
             conn.close()
 
 
-class Event:
+class EventPage:
+    """One page of events plus the cursors for its neighbours"""
+    __slots__ = ('events', 'next_cursor', 'prev_cursor')
+
+    def __init__(self, events, next_cursor=None, prev_cursor=None):
+        self.events = events
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @staticmethod
+    def encode_cursor(event):
+        return f"{event.tanggal.isoformat()}_{event.id}"
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Return (tanggal, id) or None for a missing/garbled cursor"""
+        if not cursor:
+            return None
+        try:
+            tanggal, event_id = cursor.rsplit('_', 1)
+            if len(tanggal) == 10:
+                return datetime.date.fromisoformat(tanggal), int(event_id)
+            return datetime.datetime.fromisoformat(tanggal), int(event_id)
+        except ValueError:
+            return None
+
+
+class Event(Record):
+    __slots__ = ('id', 'nama_event', 'tanggal', 'lokasi', 'harga', 'stok', 'deskripsi', 'gambar')
+    # Kolom yang diambil per jenis halaman; kolom yang tidak dipilih bernilai None
+    PROJECTIONS = {
+        'full': 'id, nama_event, tanggal, lokasi, harga, stok, deskripsi, gambar',
+        'card': 'id, nama_event, tanggal, lokasi, harga, stok, SUBSTRING(deskripsi, 1, 101) AS deskripsi, gambar',  # kartu memotong di 100 karakter
+        'row': 'id, nama_event, tanggal, lokasi, harga, stok, gambar',  # tabel admin tanpa deskripsi
+    }
+
     def __init__(self, id=None, nama_event=None, tanggal=None, lokasi=None, harga=None, stok=None, deskripsi=None, gambar=None):
         self.id = id
         self.nama_event = nama_event
@@ -137,49 +194,99 @@ class Event:
         self.gambar = gambar
 
     @staticmethod
-    def get_all():
-        """Get all events"""
+    def get_all(projection='full'):
+        """Get all events (read-through cache, see cache.py); projection picks the columns, see PROJECTIONS"""
+        key = f"events:all:{projection}:{cache.version('events')}"
+        events = cache.get(key)
+        if events is None:
+            events = Event._fetch_all(projection)
+            cache.set(key, events, cache.CACHE_CONFIG['catalogue_ttl'])
+        return events
+
+    @staticmethod
+    def _fetch_all(projection):
         conn = get_db_connection()
         try:
             with conn.cursor() as cursor:
-                cursor.execute("SELECT * FROM events")
+                cursor.execute(f"SELECT {Event.PROJECTIONS[projection]} FROM events")
+                return Event.from_rows(cursor.fetchall())
+        finally:
+            conn.close()
+
+    @staticmethod
+    def get_page(limit=12, after=None, before=None, upcoming_only=False, projection='card'):
+        """Keyset-paginated events ordered by (tanggal, id); cost is independent of catalogue size"""
+        key = f"events:page:{projection}:{cache.version('events')}:{limit}:{after}:{before}:{upcoming_only}"
+        page = cache.get(key)
+        if page is None:
+            page = Event._fetch_page(limit, after, before, upcoming_only, projection)
+            cache.set(key, page, cache.CACHE_CONFIG['catalogue_ttl'])
+        return page
+
+    @staticmethod
+    def _fetch_page(limit, after, before, upcoming_only, projection):
+        after_key = EventPage.decode_cursor(after)
+        before_key = EventPage.decode_cursor(before) if after_key is None else None
+        conditions, params = [], []
+        if upcoming_only:
+            conditions.append("tanggal >= %s")
+            params.append(datetime.date.today())
+        if after_key:
+            conditions.append("(tanggal > %s OR (tanggal = %s AND id > %s))")
+            params.extend([after_key[0], after_key[0], after_key[1]])
+        elif before_key:
+            conditions.append("(tanggal < %s OR (tanggal = %s AND id < %s))")
+            params.extend([before_key[0], before_key[0], before_key[1]])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = "tanggal DESC, id DESC" if before_key else "tanggal, id"
+        params.append(limit + 1)  # satu baris ekstra untuk tahu apakah masih ada halaman berikutnya
+
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"SELECT {Event.PROJECTIONS[projection]} FROM events {where} ORDER BY {order} LIMIT %s", params)
                 events_data = cursor.fetchall()
-                events = []
-                for event_data in events_data:
-                    events.append(Event(
-                        id=event_data['id'],
-                        nama_event=event_data['nama_event'],
-                        tanggal=event_data['tanggal'],
-                        lokasi=event_data['lokasi'],
-                        harga=event_data['harga'],
-                        stok=event_data['stok'],
-                        deskripsi=event_data['deskripsi'],
-                        gambar=event_data['gambar']
-                    ))
-                return events
         finally:
             conn.close()
 
+        has_more = len(events_data) > limit
+        events_data = events_data[:limit]
+        if before_key:
+            events_data.reverse()
+        events = Event.from_rows(events_data)
+
+        next_cursor = prev_cursor = None
+        if events:
+            # Going forward there is a previous page whenever we started from a cursor, and vice versa
+            if before_key:
+                next_cursor = EventPage.encode_cursor(events[-1])
+                prev_cursor = EventPage.encode_cursor(events[0]) if has_more else None
+            else:
+                next_cursor = EventPage.encode_cursor(events[-1]) if has_more else None
+                prev_cursor = EventPage.encode_cursor(events[0]) if after_key else None
+        return EventPage(events, next_cursor, prev_cursor)
+
     @staticmethod
-    def get_by_id(event_id):
-        """Get an event by ID"""
+    def get_by_id(event_id, use_cache=True):
+        """Get an event by ID; pass use_cache=False where stock must be read fresh"""
+        key = f"event:{event_id}"
+        if use_cache:
+            event = cache.get(key)
+            if event is not None:
+                return event
+        event = Event._fetch_by_id(event_id)
+        if event is not None:
+            cache.set(key, event, cache.CACHE_CONFIG['event_ttl'])
+        return event
+
+    @staticmethod
+    def _fetch_by_id(event_id):
         conn = get_db_connection()
         try:
             with conn.cursor() as cursor:
-                cursor.execute("SELECT * FROM events WHERE id = %s", (event_id,))
+                cursor.execute(f"SELECT {Event.PROJECTIONS['full']} FROM events WHERE id = %s", (event_id,))
                 event_data = cursor.fetchone()
-                if event_data:
-                    return Event(
-                        id=event_data['id'],
-                        nama_event=event_data['nama_event'],
-                        tanggal=event_data['tanggal'],
-                        lokasi=event_data['lokasi'],
-                        harga=event_data['harga'],
-                        stok=event_data['stok'],
-                        deskripsi=event_data['deskripsi'],
-                        gambar=event_data['gambar']
-                    )
-                return None
+                return Event.from_row(event_data) if event_data else None
         finally:
             conn.close()
 
@@ -191,7 +298,9 @@ class Event:
             with conn.cursor() as cursor:
                 sql = "INSERT INTO events (nama_event, tanggal, lokasi, harga, stok, deskripsi, gambar) VALUES (%s, %s, %s, %s, %s, %s, %s)"
                 cursor.execute(sql, (nama_event, tanggal, lokasi, harga, stok, deskripsi, gambar))
+                event_id = cursor.lastrowid
             conn.commit()
+            Event.invalidate(event_id, {'nama_event': nama_event, 'lokasi': lokasi, 'deskripsi': deskripsi})
             return True
         except Exception as e:
             print(f"Error creating event: {e}")
@@ -199,6 +308,50 @@ class Event:
         finally:
             conn.close()
 
+    @staticmethod
+    def create_many(rows):
+        """Insert (nama_event, tanggal, lokasi, harga, stok, deskripsi, gambar) tuples in one transaction.
+
+        Unlike create() this raises on failure (after rolling back), so a bulk
+        import can tell which batch to retry row by row.
+        """
+        conn = get_db_connection()
+        try:
+            conn.begin()
+            with conn.cursor() as cursor:
+                cursor.executemany(
+                    "INSERT INTO events (nama_event, tanggal, lokasi, harga, stok, deskripsi, gambar) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                    rows
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        Event.invalidate()
+        return len(rows)
+
+    @staticmethod
+    def iter_all(batch_size=1000):
+        """Yield every event as a dict, reading batch_size rows at a time (keyset on id)"""
+        last_id = 0
+        while True:
+            conn = get_db_connection()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT id, nama_event, tanggal, lokasi, harga, stok, deskripsi, gambar FROM events WHERE id > %s ORDER BY id LIMIT %s",
+                        (last_id, batch_size)
+                    )
+                    rows = cursor.fetchall()
+            finally:
+                conn.close()
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1]['id']
+
     @staticmethod
     def update(event_id, nama_event, tanggal, lokasi, harga, stok, deskripsi, gambar=''):
         """Update an existing event"""
@@ -208,6 +361,7 @@ class Event:
                 sql = "UPDATE events SET nama_event=%s, tanggal=%s, lokasi=%s, harga=%s, stok=%s, deskripsi=%s, gambar=%s WHERE id=%s"
                 cursor.execute(sql, (nama_event, tanggal, lokasi, harga, stok, deskripsi, gambar, event_id))
             conn.commit()
+            Event.invalidate(event_id, {'nama_event': nama_event, 'lokasi': lokasi, 'deskripsi': deskripsi})
             return True
         except Exception as e:
             print(f"Error updating event: {e}")
@@ -223,6 +377,7 @@ class Event:
             with conn.cursor() as cursor:
                 cursor.execute("DELETE FROM events WHERE id = %s", (event_id,))
             conn.commit()
+            Event.invalidate(event_id)
             return True
         except Exception as e:
             print(f"Error deleting event: {e}")
@@ -231,32 +386,92 @@ class Event:
             conn.close()
 
     @staticmethod
-    def search_by_nama_event(search_query):
-        """Search events by nama_event"""
+    def invalidate(event_id=None, indexed_fields=None):
+        """Drop cached catalogue pages after a write and keep the search index in step.
+
+        indexed_fields holds the new searchable fields; None means the event was deleted.
+        """
+        old_version = cache.version('events')
+        new_version = cache.bump('events')
+        if event_id is not None:
+            cache.delete(f"event:{event_id}")
+            search.index.on_write(old_version, new_version, event_id, indexed_fields)
+
+    @staticmethod
+    def stock_changed(event_id):
+        """Drop the cached event and its rendered detail page after a stock change"""
+        cache.delete(f"event:{event_id}")
+        cache.bump(f"event:{event_id}")
+
+    @staticmethod
+    def get_by_ids(event_ids, projection='full'):
+        """Fetch several events in one query, returned in the order of event_ids"""
+        if not event_ids:
+            return []
         conn = get_db_connection()
         try:
             with conn.cursor() as cursor:
-                sql = "SELECT * FROM events WHERE nama_event LIKE %s"
-                cursor.execute(sql, (f'%{search_query}%',))
+                placeholders = ', '.join(['%s'] * len(event_ids))
+                cursor.execute(f"SELECT {Event.PROJECTIONS[projection]} FROM events WHERE id IN ({placeholders})", list(event_ids))
                 events_data = cursor.fetchall()
-                events = []
-                for event_data in events_data:
-                    events.append(Event(
-                        id=event_data['id'],
-                        nama_event=event_data['nama_event'],
-                        tanggal=event_data['tanggal'],
-                        lokasi=event_data['lokasi'],
-                        harga=event_data['harga'],
-                        stok=event_data['stok'],
-                        deskripsi=event_data['deskripsi'],
-                        gambar=event_data['gambar']
-                    ))
-                return events
+        finally:
+            conn.close()
+        by_id = {event_data['id']: Event.from_row(event_data) for event_data in events_data}
+        return [by_id[event_id] for event_id in event_ids if event_id in by_id]
+
+    @staticmethod
+    def get_stock(event_ids):
+        """{event_id: stok} for several events in one query; unknown ids are left out"""
+        if not event_ids:
+            return {}
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                placeholders = ', '.join(['%s'] * len(event_ids))
+                cursor.execute(f"SELECT id, stok FROM events WHERE id IN ({placeholders})", list(event_ids))
+                return {row['id']: row['stok'] for row in cursor.fetchall()}
+        finally:
+            conn.close()
+
+    @staticmethod
+    def search_by_nama_event(search_query, limit=search.DEFAULT_LIMIT):
+        """Ranked search over nama_event, lokasi and deskripsi with prefix matching (see search.py)"""
+        event_ids = search.index.search(search_query, limit, cache.version('events'), Event._fetch_search_documents)
+        return Event.get_by_ids(event_ids, projection='card')
+
+    @staticmethod
+    def _fetch_search_documents():
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT id, nama_event, lokasi, deskripsi FROM events")
+                return cursor.fetchall()
         finally:
             conn.close()
 
 
-class Transaction:
+class PurchaseResult:
+    """Outcome of Transaction.purchase"""
+    SUCCESS = 'success'
+    SOLD_OUT = 'sold_out'
+    NOT_FOUND = 'not_found'
+    ERROR = 'error'
+    __slots__ = ('status', 'transaction_id', 'total_bayar')
+
+    def __init__(self, status, transaction_id=None, total_bayar=None):
+        self.status = status
+        self.transaction_id = transaction_id
+        self.total_bayar = total_bayar
+
+    @property
+    def ok(self):
+        return self.status == PurchaseResult.SUCCESS
+
+
+class Transaction(Record):
+    __slots__ = ('id', 'user_id', 'event_id', 'jumlah_tiket', 'total_bayar', 'nama_pemesan', 'email_pemesan',
+                 'no_telepon', 'catatan', 'tanggal_transaksi')
+
     def __init__(self, id=None, user_id=None, event_id=None, jumlah_tiket=None, total_bayar=None, nama_pemesan=None, email_pemesan=None, no_telepon=None, catatan=None, tanggal_transaksi=None):
         self.id = id
         self.user_id = user_id
@@ -276,15 +491,19 @@ class Transaction:
         try:
             with conn.cursor() as cursor:
                 sql = """
-                    INSERT INTO transactions (user_id, event_id, jumlah_tiket, total_bayar, nama_pemesan, email_pemesan, no_telepon)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    INSERT INTO transactions (user_id, event_id, jumlah_tiket, total_bayar, nama_pemesan, email_pemesan, no_telepon, tanggal_transaksi)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
                 """
                 # Using user's name and email as default for the order
                 from flask import session
                 # We'll get user details from the database
                 user = User.get_by_id(user_id)
                 print(user)
-                cursor.execute(sql, (user_id, event_id, jumlah_tiket, total_bayar, user.nama_lengkap, user.email, ''))
+                tanggal_transaksi = datetime.datetime.now().replace(microsecond=0)
+                conn.begin()
+                cursor.execute(sql, (user_id, event_id, jumlah_tiket, total_bayar, user.nama_lengkap, user.email, '', tanggal_transaksi))
+                SalesSummary.record(cursor, event_id, jumlah_tiket, total_bayar)
+                SalesRollup.record(cursor, event_id, jumlah_tiket, total_bayar, tanggal_transaksi)
             conn.commit()
             return True
         except Exception as e:
@@ -300,10 +519,14 @@ class Transaction:
         try:
             with conn.cursor() as cursor:
                 sql = """
-                    INSERT INTO transactions (user_id, event_id, jumlah_tiket, total_bayar, nama_pemesan, email_pemesan, no_telepon, catatan)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    INSERT INTO transactions (user_id, event_id, jumlah_tiket, total_bayar, nama_pemesan, email_pemesan, no_telepon, catatan, tanggal_transaksi)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
                 """
-                cursor.execute(sql, (user_id, event_id, jumlah_tiket, total_bayar, nama_pemesan, email_pemesan, no_telepon, catatan))
+                tanggal_transaksi = datetime.datetime.now().replace(microsecond=0)
+                conn.begin()
+                cursor.execute(sql, (user_id, event_id, jumlah_tiket, total_bayar, nama_pemesan, email_pemesan, no_telepon, catatan, tanggal_transaksi))
+                SalesSummary.record(cursor, event_id, jumlah_tiket, total_bayar)
+                SalesRollup.record(cursor, event_id, jumlah_tiket, total_bayar, tanggal_transaksi)
             conn.commit()
             return True
         except Exception as e:
@@ -312,38 +535,102 @@ class Transaction:
         finally:
             conn.close()
 
+    @staticmethod
+    def purchase(user_id, event_id, jumlah_tiket, nama_pemesan, email_pemesan, no_telepon, catatan='', hold_id=None):
+        """Atomically take stock and record the transaction; never sells past zero.
+
+        With hold_id the stock reserved by that StockHold is converted instead
+        (jumlah_tiket is then taken from the hold). An expired or unknown hold
+        falls back to a normal conditional decrement.
+        """
+        conn = get_db_connection()
+        try:
+            conn.begin()
+            with conn.cursor() as cursor:
+                held = None
+                if hold_id:
+                    # Kunci baris event dulu, baru hold (urutan sama dengan place()/release()); harga di bawah
+                    # juga dibaca dari baris yang terkunci ini
+                    cursor.execute("SELECT id FROM events WHERE id = %s FOR UPDATE", (event_id,))
+                    held = StockHold.take(cursor, hold_id, user_id, event_id)
+                if held is not None:
+                    jumlah_tiket = held
+                elif jumlah_tiket < 1:
+                    conn.rollback()
+                    return PurchaseResult(PurchaseResult.ERROR)
+                else:
+                    # Conditional decrement: the row lock serialises buyers and the WHERE clause rejects oversells
+                    cursor.execute(
+                        "UPDATE events SET stok = stok - %s WHERE id = %s AND stok >= %s",
+                        (jumlah_tiket, event_id, jumlah_tiket)
+                    )
+                    if cursor.rowcount == 0:
+                        conn.rollback()
+                        cursor.execute("SELECT 1 FROM events WHERE id = %s", (event_id,))
+                        if cursor.fetchone() is None:
+                            return PurchaseResult(PurchaseResult.NOT_FOUND)
+                        Event.stock_changed(event_id)
+                        return PurchaseResult(PurchaseResult.SOLD_OUT)
+
+                # Price is taken from the locked row, not from whatever the page showed
+                cursor.execute("SELECT harga FROM events WHERE id = %s", (event_id,))
+                total_bayar = cursor.fetchone()['harga'] * jumlah_tiket
+                # Waktu diisi di sini agar transaksi dan bucket SalesRollup-nya memakai jam yang sama
+                tanggal_transaksi = datetime.datetime.now().replace(microsecond=0)
+                cursor.execute("""
+                    INSERT INTO transactions (user_id, event_id, jumlah_tiket, total_bayar, nama_pemesan, email_pemesan, no_telepon, catatan, tanggal_transaksi)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, (user_id, event_id, jumlah_tiket, total_bayar, nama_pemesan, email_pemesan, no_telepon, catatan, tanggal_transaksi))
+                transaction_id = cursor.lastrowid
+                SalesSummary.record(cursor, event_id, jumlah_tiket, total_bayar)
+                SalesRollup.record(cursor, event_id, jumlah_tiket, total_bayar, tanggal_transaksi)
+            conn.commit()
+            # Stok berubah: detail event dibaca ulang, daftar event basi paling lama catalogue_ttl
+            Event.stock_changed(event_id)
+            return PurchaseResult(PurchaseResult.SUCCESS, transaction_id, total_bayar)
+        except Exception as e:
+            print(f"Error processing purchase: {e}")
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            return PurchaseResult(PurchaseResult.ERROR)
+        finally:
+            conn.close()
+
     @staticmethod
     def get_by_user_id(user_id):
         """Get all transactions for a specific user"""
         conn = get_db_connection()
         try:
             with conn.cursor() as cursor:
+                # Baris DictCursor langsung dipakai template; tidak perlu disalin ke dict baru
                 cursor.execute("""
-                    SELECT t.*, e.nama_event, e.tanggal, e.lokasi
+                    SELECT t.id, t.user_id, t.event_id, t.jumlah_tiket, t.total_bayar, t.nama_pemesan, t.email_pemesan,
+                           t.no_telepon, t.catatan, t.tanggal_transaksi, e.nama_event, e.tanggal, e.lokasi
                     FROM transactions t
                     JOIN events e ON t.event_id = e.id
                     WHERE t.user_id = %s
                     ORDER BY t.tanggal_transaksi DESC
                 """, (user_id,))
-                transactions_data = cursor.fetchall()
-                transactions = []
-                for trans_data in transactions_data:
-                    transactions.append({
-                        'id': trans_data['id'],
-                        'user_id': trans_data['user_id'],
-                        'event_id': trans_data['event_id'],
-                        'jumlah_tiket': trans_data['jumlah_tiket'],
-                        'total_bayar': trans_data['total_bayar'],
-                        'nama_pemesan': trans_data['nama_pemesan'],
-                        'email_pemesan': trans_data['email_pemesan'],
-                        'no_telepon': trans_data['no_telepon'],
-                        'catatan': trans_data['catatan'],
-                        'tanggal_transaksi': trans_data['tanggal_transaksi'],
-                        'nama_event': trans_data['nama_event'],
-                        'tanggal': trans_data['tanggal'],
-                        'lokasi': trans_data['lokasi']
-                    })
-                return transactions
+                return cursor.fetchall()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def get_details(transaction_id):
+        """One transaction with its buyer and event, as a dict row (None if it does not exist)"""
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT t.*, u.nama_lengkap, e.nama_event, e.tanggal, e.lokasi
+                    FROM transactions t
+                    JOIN users u ON t.user_id = u.id
+                    JOIN events e ON t.event_id = e.id
+                    WHERE t.id = %s
+                """, (transaction_id,))
+                return cursor.fetchone()
         finally:
             conn.close()
 
@@ -365,25 +652,384 @@ class Transaction:
             conn.close()
 
     @staticmethod
-    def get_total_penjualan():
-        """Get total sales amount"""
+    def _filter_conditions(event_id=None, date_from=None, date_to=None):
+        """WHERE fragments and params for the event / inclusive date range filters"""
+        conditions, params = [], []
+        if event_id:
+            conditions.append("t.event_id = %s")
+            params.append(event_id)
+        if date_from:
+            conditions.append("t.tanggal_transaksi >= %s")
+            params.append(date_from)
+        if date_to:
+            conditions.append("t.tanggal_transaksi < %s")
+            params.append(date_to + datetime.timedelta(days=1))
+        return conditions, params
+
+    @staticmethod
+    def stream_with_details(event_id=None, date_from=None, date_to=None, batch_size=1000):
+        """Yield transactions with user/event names, oldest first, from an unbuffered cursor.
+
+        Rows are pulled from the server batch_size at a time, so memory stays flat
+        and the first row is available immediately however large the result is.
+        """
+        conditions, params = Transaction._filter_conditions(event_id, date_from, date_to)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        conn = get_streaming_connection()
+        finished = False
+        try:
+            cursor = conn.cursor(pymysql.cursors.SSDictCursor)
+            cursor.execute(f"""
+                SELECT t.*, u.nama_lengkap, e.nama_event
+                FROM transactions t
+                JOIN users u ON t.user_id = u.id
+                JOIN events e ON t.event_id = e.id
+                {where}
+                ORDER BY t.id
+            """, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+            cursor.close()
+            finished = True
+        finally:
+            if finished:
+                conn.close()
+            else:
+                # Klien berhenti di tengah jalan: sisa hasil unbuffered lebih murah diputus daripada dibaca habis
+                conn.discard()
+
+    @staticmethod
+    def get_page(limit=20, before_id=None, event_id=None, date_from=None, date_to=None):
+        """Newest-first transactions with user/event names, keyset-paginated on id.
+
+        Returns (transactions, next_before_id); next_before_id is None on the last page.
+        date_from/date_to are inclusive datetime.date bounds on tanggal_transaksi.
+        """
+        conditions, params = Transaction._filter_conditions(event_id, date_from, date_to)
+        if before_id:
+            conditions.append("t.id < %s")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        params.append(limit + 1)
+
         conn = get_db_connection()
         try:
             with conn.cursor() as cursor:
-                cursor.execute("SELECT SUM(total_bayar) as total FROM transactions")
-                result = cursor.fetchone()
-                return result['total']
+                cursor.execute(f"""
+                    SELECT t.id, t.event_id, t.jumlah_tiket, t.total_bayar, t.tanggal_transaksi, u.nama_lengkap, e.nama_event
+                    FROM transactions t
+                    JOIN users u ON t.user_id = u.id
+                    JOIN events e ON t.event_id = e.id
+                    {where}
+                    ORDER BY t.id DESC
+                    LIMIT %s
+                """, params)
+                transactions_data = cursor.fetchall()
         finally:
             conn.close()
 
+        if len(transactions_data) > limit:
+            transactions_data = transactions_data[:limit]
+            return transactions_data, transactions_data[-1]['id']
+        return transactions_data, None
+
+    @staticmethod
+    def get_total_penjualan():
+        """Get total sales amount (from the maintained sales_summary aggregates)"""
+        return SalesSummary.get_totals()['total_penjualan']
+
     @staticmethod
     def get_total_tiket_sold():
-        """Get total number of tickets sold"""
+        """Get total number of tickets sold (from the maintained sales_summary aggregates)"""
+        return SalesSummary.get_totals()['total_tiket']
+
+
+class StockHold(Record):
+    """Temporary reservation of tickets between beli_tiket and checkout.
+
+    Placing a hold takes the stock immediately (so stok always shows what is
+    really buyable); checkout converts it into a transaction and an expired
+    hold gives the stock back (see reservations.py for the sweeper).
+    """
+    __slots__ = ('id', 'event_id', 'user_id', 'jumlah_tiket', 'expires_at')
+    DEADLOCK_RETRIES = 3
+
+    def __init__(self, id=None, event_id=None, user_id=None, jumlah_tiket=None, expires_at=None):
+        self.id = id
+        self.event_id = event_id
+        self.user_id = user_id
+        self.jumlah_tiket = jumlah_tiket
+        self.expires_at = expires_at
+
+    @staticmethod
+    def place(user_id, event_id, jumlah_tiket, ttl):
+        """Reserve tickets for ttl seconds; returns (status, StockHold or None) using PurchaseResult statuses.
+
+        A user holds at most one reservation per event: an earlier one is released first.
+        """
+        if jumlah_tiket < 1:
+            return PurchaseResult.ERROR, None
+        for attempt in range(1, StockHold.DEADLOCK_RETRIES + 1):
+            try:
+                return StockHold._place_once(user_id, event_id, jumlah_tiket, ttl)
+            except Exception as e:
+                if db.is_deadlock(e) and attempt < StockHold.DEADLOCK_RETRIES:
+                    continue
+                print(f"Error placing stock hold: {e}")
+                return PurchaseResult.ERROR, None
+
+    @staticmethod
+    def _place_once(user_id, event_id, jumlah_tiket, ttl):
+        conn = get_db_connection()
+        try:
+            conn.begin()
+            with conn.cursor() as cursor:
+                # Baris event dikunci lebih dulu: hold untuk event yang sama antre di sini, dan
+                # stock_holds tidak dibaca dengan FOR UPDATE (gap lock InnoDB pada kunci yang belum
+                # ada membuat dua INSERT saling menunggu = deadlock). Urutan kunci event -> hold
+                # sama dengan release().
+                cursor.execute("SELECT stok FROM events WHERE id = %s FOR UPDATE", (event_id,))
+                event = cursor.fetchone()
+                if event is None:
+                    conn.rollback()
+                    return PurchaseResult.NOT_FOUND, None
+                cursor.execute("SELECT id, jumlah_tiket FROM stock_holds WHERE user_id = %s AND event_id = %s",
+                               (user_id, event_id))
+                stok = event['stok']
+                for old_hold in cursor.fetchall():
+                    cursor.execute("DELETE FROM stock_holds WHERE id = %s", (old_hold['id'],))
+                    if cursor.rowcount:
+                        stok += old_hold['jumlah_tiket']
+                if stok < jumlah_tiket:
+                    conn.rollback()
+                    return PurchaseResult.SOLD_OUT, None
+                cursor.execute("UPDATE events SET stok = %s WHERE id = %s", (stok - jumlah_tiket, event_id))
+
+                expires_at = datetime.datetime.now().replace(microsecond=0) + datetime.timedelta(seconds=ttl)
+                cursor.execute(
+                    "INSERT INTO stock_holds (event_id, user_id, jumlah_tiket, expires_at) VALUES (%s, %s, %s, %s)",
+                    (event_id, user_id, jumlah_tiket, expires_at)
+                )
+                hold = StockHold(cursor.lastrowid, event_id, user_id, jumlah_tiket, expires_at)
+            conn.commit()
+            Event.stock_changed(event_id)
+            return PurchaseResult.SUCCESS, hold
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def take(cursor, hold_id, user_id, event_id):
+        """Consume a hold inside the caller's transaction, after it locked the event row; returns its ticket count or None"""
+        cursor.execute(
+            "SELECT jumlah_tiket FROM stock_holds WHERE id = %s AND user_id = %s AND event_id = %s FOR UPDATE",
+            (hold_id, user_id, event_id)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        cursor.execute("DELETE FROM stock_holds WHERE id = %s", (hold_id,))
+        return row['jumlah_tiket']
+
+    @staticmethod
+    def release(hold_id):
+        """Give a hold's tickets back to the event; a no-op if it was already converted or released"""
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT event_id, jumlah_tiket FROM stock_holds WHERE id = %s", (hold_id,))
+                row = cursor.fetchone()
+                if row is None:
+                    return False
+                conn.begin()
+                # Kunci event dulu, baru hold (urutan yang sama dengan place()); DELETE yang tidak
+                # menemukan baris berarti hold sudah dipakai checkout atau dilepas worker lain
+                cursor.execute("SELECT id FROM events WHERE id = %s FOR UPDATE", (row['event_id'],))
+                cursor.execute("DELETE FROM stock_holds WHERE id = %s", (hold_id,))
+                if cursor.rowcount == 0:
+                    conn.rollback()
+                    return False
+                cursor.execute("UPDATE events SET stok = stok + %s WHERE id = %s", (row['jumlah_tiket'], row['event_id']))
+            conn.commit()
+            Event.stock_changed(row['event_id'])
+            return True
+        except Exception as e:
+            print(f"Error releasing stock hold: {e}")
+            conn.rollback()
+            return False
+        finally:
+            conn.close()
+
+    @staticmethod
+    def get_expired_ids(now, limit=100):
+        """Ids of holds past expiry (index range scan on expires_at)"""
         conn = get_db_connection()
         try:
             with conn.cursor() as cursor:
-                cursor.execute("SELECT SUM(jumlah_tiket) as total_tiket FROM transactions")
-                result = cursor.fetchone()
-                return result['total_tiket']
+                cursor.execute("SELECT id FROM stock_holds WHERE expires_at <= %s ORDER BY expires_at LIMIT %s", (now, limit))
+                return [row['id'] for row in cursor.fetchall()]
         finally:
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+
+class SalesSummary:
+    """Per-event revenue and tickets sold, updated in the same DB transaction as each sale.
+
+    Global totals are summed over one row per event instead of scanning transactions,
+    and there is deliberately no global row so concurrent sales of different events
+    never contend on the same lock.
+    """
+
+    @staticmethod
+    def record(cursor, event_id, jumlah_tiket, total_bayar):
+        """Add one sale; call with the cursor of the transaction that inserts it"""
+        cursor.execute("""
+            INSERT INTO sales_summary (event_id, total_penjualan, total_tiket) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE total_penjualan = total_penjualan + VALUES(total_penjualan),
+                                    total_tiket = total_tiket + VALUES(total_tiket)
+        """, (event_id, total_bayar, jumlah_tiket))
+
+    @staticmethod
+    def rebuild():
+        """Recompute every aggregate from the transactions table (backfill/repair)"""
+        conn = get_db_connection()
+        try:
+            conn.begin()
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM sales_summary")
+                cursor.execute("""
+                    INSERT INTO sales_summary (event_id, total_penjualan, total_tiket)
+                    SELECT event_id, SUM(total_bayar), SUM(jumlah_tiket) FROM transactions GROUP BY event_id
+                """)
+            conn.commit()
+            return True
+        except Exception as e:
+            print(f"Error rebuilding sales summary: {e}")
+            conn.rollback()
+            return False
+        finally:
+            conn.close()
+
+    @staticmethod
+    def get_totals():
+        """Global revenue and tickets sold"""
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT SUM(total_penjualan) AS total_penjualan, SUM(total_tiket) AS total_tiket FROM sales_summary")
+                return cursor.fetchone()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def get(event_id):
+        """{'total_penjualan': ..., 'total_tiket': ...} of one event, or None if it has no sales"""
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT total_penjualan, total_tiket FROM sales_summary WHERE event_id = %s", (event_id,))
+                return cursor.fetchone()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def get_by_event():
+        """{event_id: {'total_penjualan': ..., 'total_tiket': ...}} for every event with sales"""
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT event_id, total_penjualan, total_tiket FROM sales_summary")
+                return {row['event_id']: row for row in cursor.fetchall()}
+        finally:
+            conn.close()
+
+
+class SalesRollup:
+    """Tickets, revenue and transaction count per event per hour and per day.
+
+    Each sale adds to its two buckets in the same DB transaction that records it,
+    so "how fast is event X selling" reads a handful of primary-key rows instead
+    of scanning transactions. Buckets are naive local datetimes like tanggal_transaksi.
+    """
+    GRANULARITIES = ('hour', 'day')
+
+    @staticmethod
+    def bucket(at, granularity):
+        """Start of the hour/day bucket that contains datetime at"""
+        if granularity == 'hour':
+            return at.replace(minute=0, second=0, microsecond=0)
+        return at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def record(cursor, event_id, jumlah_tiket, total_bayar, at):
+        """Add one sale made at datetime at; call with the cursor of the transaction that inserts it"""
+        cursor.executemany("""
+            INSERT INTO sales_rollups (event_id, granularity, bucket_start, total_tiket, total_penjualan, jumlah_transaksi)
+            VALUES (%s, %s, %s, %s, %s, 1)
+            ON DUPLICATE KEY UPDATE total_tiket = total_tiket + VALUES(total_tiket),
+                                    total_penjualan = total_penjualan + VALUES(total_penjualan),
+                                    jumlah_transaksi = jumlah_transaksi + 1
+        """, [(event_id, granularity, SalesRollup.bucket(at, granularity), jumlah_tiket, total_bayar)
+              for granularity in SalesRollup.GRANULARITIES])
+
+    # Awal bucket sebagai teks DATETIME; db_sqlite menerjemahkan DATE_FORMAT ke strftime
+    BUCKET_FORMATS = {'hour': '%Y-%m-%d %H:00:00', 'day': '%Y-%m-%d 00:00:00'}
+
+    @staticmethod
+    def rebuild():
+        """Recompute every bucket from the transactions table (backfill/repair); returns the number of buckets"""
+        conn = get_db_connection()
+        try:
+            conn.begin()
+            count = 0
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM sales_rollups")
+                for granularity in SalesRollup.GRANULARITIES:
+                    bucket_start = f"DATE_FORMAT(tanggal_transaksi, '{SalesRollup.BUCKET_FORMATS[granularity]}')"
+                    count += cursor.execute(f"""
+                        INSERT INTO sales_rollups (event_id, granularity, bucket_start, total_tiket, total_penjualan, jumlah_transaksi)
+                        SELECT event_id, '{granularity}', {bucket_start}, SUM(jumlah_tiket), SUM(total_bayar), COUNT(*)
+                        FROM transactions GROUP BY event_id, {bucket_start}
+                    """)
+            conn.commit()
+            return count
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def get_series(event_id, granularity, since):
+        """Buckets of one event from since (inclusive) on, oldest first"""
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT bucket_start, total_tiket, total_penjualan, jumlah_transaksi FROM sales_rollups
+                    WHERE event_id = %s AND granularity = %s AND bucket_start >= %s
+                    ORDER BY bucket_start
+                """, (event_id, granularity, since))
+                return cursor.fetchall()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def get_recent_tickets(since):
+        """{event_id: tickets sold since} over the hourly buckets, for every event that sold any"""
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT event_id, SUM(total_tiket) AS total_tiket FROM sales_rollups
+                    WHERE granularity = 'hour' AND bucket_start >= %s
+                    GROUP BY event_id
+                """, (since,))
+                return {row['event_id']: int(row['total_tiket']) for row in cursor.fetchall()}
+        finally:
+            conn.close()
@@ -0,0 +1,97 @@
+import hashlib
+from functools import wraps
+
+from flask import make_response, request, session
+from markupsafe import Markup
+
+import cache
+
+# Konfigurasi Page Cache
+PAGE_CACHE_CONFIG = {
+    'enabled': True,
+    'fragment_ttl': 300,   # kartu event: kuncinya sudah memuat versi katalog dan stok
+}
+
+
+def viewer_kind():
+    """'anon', 'member' or 'admin': the only session state the public templates render"""
+    if 'user_id' not in session:
+        return 'anon'
+    return 'admin' if session.get('role') == 'admin' else 'member'
+
+
+def _is_shared_view():
+    # Halaman anonim tanpa flash message identik untuk semua pengunjung
+    return viewer_kind() == 'anon' and not session.get('_flashes')
+
+
+def _page_key(namespaces, view_args):
+    versions = ':'.join(str(cache.version(name.format(**view_args))) for name in namespaces)
+    args = sorted(view_args.items())
+    query = sorted(request.args.items(multi=True))
+    digest = hashlib.sha1(repr((args, query)).encode()).hexdigest()[:16]
+    return f"page:{request.endpoint}:{digest}:{versions}"
+
+
+def cached_page(ttl_key, namespaces=('events',)):
+    """Cache the rendered response of a public GET route for anonymous visitors.
+
+    ttl_key names the CACHE_CONFIG TTL to use; namespaces are cache.version()
+    namespaces (formatted with the view args, e.g. 'event:{event_id}') whose
+    bump makes the page stale. Every response gets an ETag and answers 304
+    to a matching If-None-Match.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**view_args):
+            if not PAGE_CACHE_CONFIG['enabled'] or not _is_shared_view():
+                response = make_response(view(**view_args))
+                if response.status_code == 200:
+                    response.add_etag()
+                return response.make_conditional(request)
+
+            key = _page_key(namespaces, view_args)
+            entry = cache.get(key)
+            if entry is not None:
+                body, mimetype, etag = entry
+                response = make_response(body)
+                response.mimetype = mimetype
+                response.set_etag(etag)
+                response.headers['X-Page-Cache'] = 'HIT'
+            else:
+                response = make_response(view(**view_args))
+                # Redirect, error atau flash baru (session berubah) tidak boleh dibagi
+                if response.status_code == 200 and not session.modified and not response.direct_passthrough:
+                    response.add_etag()
+                    cache.set(key, (response.get_data(), response.mimetype, response.get_etag()[0]),
+                              cache.CACHE_CONFIG[ttl_key])
+                    response.headers['X-Page-Cache'] = 'MISS'
+            response.vary.add('Cookie')
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+
+def fragment(name, *key_parts, caller=None):
+    """Jinja call block caching a rendered fragment per viewer kind and catalogue version:
+
+        {% call fragment('event-card', event.id, event.stok) %}...{% endcall %}
+    """
+    if not PAGE_CACHE_CONFIG['enabled']:
+        return caller()
+    parts = ':'.join(str(part) for part in key_parts)
+    key = f"fragment:{name}:{cache.version('events')}:{viewer_kind()}:{parts}"
+    html = cache.get(key)
+    if html is None:
+        html = str(caller())
+        cache.set(key, html, PAGE_CACHE_CONFIG['fragment_ttl'])
+    return Markup(html)
+
+
+def init_app(app):
+    """Read PAGE_CACHE_* settings and expose fragment() to templates"""
+    for key in PAGE_CACHE_CONFIG:
+        config_key = f'PAGE_CACHE_{key.upper()}'
+        if config_key in app.config:
+            PAGE_CACHE_CONFIG[key] = app.config[config_key]
+    app.jinja_env.globals['fragment'] = fragment
@@ -0,0 +1,107 @@
+import datetime
+import heapq
+import threading
+import time
+
+from models import StockHold
+
+# Konfigurasi Reservasi (detik)
+RESERVATION_CONFIG = {
+    'hold_ttl': 600,          # lama tiket ditahan untuk checkout
+    'safety_sweep': 60,       # interval sapuan cadangan untuk hold milik worker lain
+}
+
+
+class HoldSweeper:
+    """Releases expired holds from a min-heap ordered by expiry.
+
+    The background thread sleeps until the earliest expiry instead of polling
+    the table. Holds placed by other workers (or left behind by a crashed one)
+    are caught by a periodic indexed range query on expires_at.
+    """
+
+    def __init__(self, release=StockHold.release, safety_sweep=60):
+        self._release = release
+        self.safety_sweep = safety_sweep
+        self._heap = []
+        self._cond = threading.Condition()
+        self._thread = None
+        # The first safety sweep runs as soon as the thread starts, catching holds
+        # that expired while no worker was running
+        self._next_safety_sweep = 0
+
+    def schedule(self, hold_id, expires_at):
+        """Track a hold; expires_at is a naive local datetime like the DB column"""
+        with self._cond:
+            heapq.heappush(self._heap, (expires_at.timestamp(), hold_id))
+            self._cond.notify()
+        self.ensure_running()
+
+    def ensure_running(self):
+        """Start the background thread if it is not running yet"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='hold-sweeper', daemon=True)
+            self._thread.start()
+
+    def _due(self):
+        """Pop every hold whose expiry has passed, waiting until one is due"""
+        with self._cond:
+            while True:
+                now = time.time()
+                if self._heap and self._heap[0][0] <= now:
+                    due = []
+                    while self._heap and self._heap[0][0] <= now:
+                        due.append(heapq.heappop(self._heap)[1])
+                    return due
+                wake_at = self._next_safety_sweep
+                if self._heap:
+                    wake_at = min(wake_at, self._heap[0][0])
+                if wake_at <= now:
+                    return []
+                self._cond.wait(wake_at - now)
+
+    def _run(self):
+        while True:
+            for hold_id in self._due():
+                self._safe_release(hold_id)
+            if time.time() >= self._next_safety_sweep:
+                self._next_safety_sweep = time.time() + self.safety_sweep
+                try:
+                    expired = StockHold.get_expired_ids(datetime.datetime.now())
+                except Exception as e:
+                    print(f"Error sweeping expired holds: {e}")
+                    expired = []
+                for hold_id in expired:
+                    self._safe_release(hold_id)
+
+    def _safe_release(self, hold_id):
+        try:
+            self._release(hold_id)
+        except Exception as e:
+            print(f"Error releasing hold {hold_id}: {e}")
+
+
+sweeper = HoldSweeper()
+
+
+def place_hold(user_id, event_id, jumlah_tiket):
+    """Reserve tickets and schedule their release; returns (status, StockHold or None)"""
+    status, hold = StockHold.place(user_id, event_id, jumlah_tiket, RESERVATION_CONFIG['hold_ttl'])
+    if hold is not None:
+        sweeper.schedule(hold.id, hold.expires_at)
+    return status, hold
+
+
+def init_app(app):
+    """Read RESERVATION_HOLD_TTL / RESERVATION_SAFETY_SWEEP from app.config"""
+    for key in RESERVATION_CONFIG:
+        config_key = f'RESERVATION_{key.upper()}'
+        if config_key in app.config:
+            RESERVATION_CONFIG[key] = app.config[config_key]
+    sweeper.safety_sweep = RESERVATION_CONFIG['safety_sweep']
+    # Thread dimulai saat request pertama, bukan saat import (CLI tidak butuh DB)
+    app.before_request(sweeper.ensure_running)
@@ -0,0 +1,157 @@
+import bisect
+import math
+import re
+import threading
+import time
+import unicodedata
+
+# Bobot per kolom: kecocokan di nama event lebih penting daripada di deskripsi
+FIELD_WEIGHTS = {
+    'nama_event': 3.0,
+    'lokasi': 2.0,
+    'deskripsi': 1.0,
+}
+PREFIX_PENALTY = 0.5      # kecocokan awalan (prefix) bernilai separuh kecocokan penuh
+MAX_PREFIX_EXPANSION = 50  # batas jumlah term yang diambil dari satu prefix
+DEFAULT_LIMIT = 50
+
+# Konfigurasi Pencarian (detik)
+SEARCH_CONFIG = {
+    # Index dibangun ulang paling lambat setelah sekian detik. Dengan CACHE_BACKEND 'memory' worker
+    # lain tidak pernah melihat versi katalog naik, jadi ini satu-satunya jalan perubahan mereka masuk
+    'max_age': 60,
+}
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Lowercase, strip accents and split text into word tokens"""
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', str(text).lower())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return _TOKEN_RE.findall(text)
+
+
+class SearchIndex:
+    """In-process inverted index over nama_event, lokasi and deskripsi.
+
+    The index remembers the catalogue version it reflects (see cache.version).
+    Writes made by this process are applied incrementally. A write by another
+    worker changes the version only if the cache backend is shared (sqlite);
+    the index is then rebuilt on the next search. With the per-process memory
+    cache it is not, so the index is also rebuilt once it is older than max_age
+    and another worker's edits can take that long to show up.
+    """
+
+    def __init__(self):
+        self._postings = {}   # term -> {event_id: weighted term frequency}
+        self._doc_terms = {}  # event_id -> set of terms, used for removal
+        self._terms = []      # sorted vocabulary for prefix lookups
+        self.version = None
+        self.built_at = None  # time.monotonic() of the last full build
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def build(self, documents, version):
+        """Replace the index with `documents` (dicts with id + indexed fields)"""
+        with self._lock:
+            self._postings, self._doc_terms, self._terms = {}, {}, []
+            for doc in documents:
+                self._add(doc['id'], doc)
+            self._terms = sorted(self._postings)
+            self.version = version
+            self.built_at = time.monotonic()
+
+    def on_write(self, old_version, new_version, event_id, document=None):
+        """Apply one catalogue write; document=None means the event was deleted"""
+        with self._lock:
+            if self.version is None or self.version != old_version:
+                self.version = None
+                return
+            self._remove(event_id)
+            if document is not None:
+                self._add(event_id, document, keep_sorted=True)
+            self.version = new_version
+
+    def search(self, query, limit=DEFAULT_LIMIT, version=None, loader=None):
+        """Return event ids ranked by relevance; every query term must match (as word or prefix)"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            if loader is not None and (self.version is None or self.version != version or
+                                       time.monotonic() - self.built_at > SEARCH_CONFIG['max_age']):
+                self.build(loader(), version)
+
+            total_docs = len(self._doc_terms) or 1
+            scores = None
+            for term in terms:
+                term_scores = {}
+                for matched, penalty in self._expand(term):
+                    postings = self._postings[matched]
+                    idf = math.log(1 + total_docs / len(postings))
+                    for event_id, weight in postings.items():
+                        score = idf * weight * penalty
+                        if score > term_scores.get(event_id, 0):
+                            term_scores[event_id] = score
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {event_id: scores[event_id] + score
+                              for event_id, score in term_scores.items() if event_id in scores}
+                if not scores:
+                    return []
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [event_id for event_id, _ in ranked[:limit]]
+
+    def _expand(self, term):
+        """Yield (term, penalty) for the exact term and vocabulary entries starting with it"""
+        if term in self._postings:
+            yield term, 1.0
+        start = bisect.bisect_right(self._terms, term)
+        for candidate in self._terms[start:start + MAX_PREFIX_EXPANSION]:
+            if not candidate.startswith(term):
+                break
+            yield candidate, PREFIX_PENALTY
+
+    def _add(self, event_id, document, keep_sorted=False):
+        weights = {}
+        for field, field_weight in FIELD_WEIGHTS.items():
+            for token in tokenize(document.get(field)):
+                weights[token] = weights.get(token, 0) + field_weight
+        for term, weight in weights.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                if keep_sorted:
+                    bisect.insort(self._terms, term)
+            postings[event_id] = weight
+        self._doc_terms[event_id] = set(weights)
+
+    def _remove(self, event_id):
+        for term in self._doc_terms.pop(event_id, ()):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(event_id, None)
+            if not postings:
+                del self._postings[term]
+                i = bisect.bisect_left(self._terms, term)
+                if i < len(self._terms) and self._terms[i] == term:
+                    del self._terms[i]
+
+
+index = SearchIndex()
+
+
+def init_app(app):
+    """Read SEARCH_MAX_AGE from app.config"""
+    for key in SEARCH_CONFIG:
+        config_key = f'SEARCH_{key.upper()}'
+        if config_key in app.config:
+            SEARCH_CONFIG[key] = app.config[config_key]
@@ -0,0 +1,242 @@
+import copy
+import pickle
+import secrets
+import threading
+import time
+
+from flask import session
+from flask.sessions import SecureCookieSession, SessionInterface
+
+import db_sqlite
+
+# Konfigurasi Session (detik)
+SESSION_CONFIG = {
+    'backend': 'sqlite',        # 'sqlite' (dibagi antar worker) atau 'memory' (per proses: tes / dev satu proses)
+    'path': 'festix_sessions.sqlite3',
+    'lifetime': 7200,           # session berakhir setelah sekian detik tanpa aktivitas (sliding)
+    'touch_interval': 300,      # masa berlaku diperpanjang paling sering sekali per interval ini
+    'identity_ttl': 60,         # nama/role di session dicocokkan ulang ke tabel users setelah sekian detik
+}
+
+
+class SessionStore:
+    """Interface every session backend implements; data is a plain dict"""
+
+    def load(self, sid, now):
+        """Return (data, expires_at) or None if the session is unknown or expired"""
+        raise NotImplementedError
+
+    def save(self, sid, data, user_id, expires_at):
+        raise NotImplementedError
+
+    def delete(self, sid):
+        raise NotImplementedError
+
+    def delete_user(self, user_id):
+        """Revoke every session of a user; returns how many were removed"""
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """Sessions held in this process"""
+
+    def __init__(self):
+        self._data = {}      # sid -> (data, user_id, expires_at)
+        self._by_user = {}   # user_id -> set of sid
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def load(self, sid, now):
+        with self._lock:
+            item = self._data.get(sid)
+            if item is None:
+                return None
+            if item[2] <= now:
+                self._remove(sid)
+                return None
+            return copy.deepcopy(item[0]), item[2]
+
+    def save(self, sid, data, user_id, expires_at):
+        with self._lock:
+            self._remove(sid)
+            self._data[sid] = (copy.deepcopy(data), user_id, expires_at)
+            if user_id is not None:
+                self._by_user.setdefault(user_id, set()).add(sid)
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                now = time.time()
+                for expired in [s for s, item in self._data.items() if item[2] <= now]:
+                    self._remove(expired)
+
+    def delete(self, sid):
+        with self._lock:
+            self._remove(sid)
+
+    def delete_user(self, user_id):
+        with self._lock:
+            sids = list(self._by_user.get(user_id, ()))
+            for sid in sids:
+                self._remove(sid)
+            return len(sids)
+
+    def _remove(self, sid):
+        item = self._data.pop(sid, None)
+        if item is not None and item[1] is not None:
+            sids = self._by_user.get(item[1])
+            if sids is not None:
+                sids.discard(sid)
+                if not sids:
+                    del self._by_user[item[1]]
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions stored in a local SQLite file so every worker on the box shares them"""
+
+    def __init__(self, path):
+        self.path = path
+        self._db = db_sqlite.LocalDatabase(path)
+        self._writes = 0
+        conn = self._db.connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                sid TEXT PRIMARY KEY, data BLOB NOT NULL, user_id INTEGER, expires_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions (user_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)")
+
+    def load(self, sid, now):
+        row = self._db.connection().execute(
+            "SELECT data, expires_at FROM sessions WHERE sid = ? AND expires_at > ?", (sid, now)
+        ).fetchone()
+        return (pickle.loads(row[0]), row[1]) if row else None
+
+    def save(self, sid, data, user_id, expires_at):
+        conn = self._db.connection()
+        conn.execute("INSERT OR REPLACE INTO sessions (sid, data, user_id, expires_at) VALUES (?, ?, ?, ?)",
+                     (sid, pickle.dumps(data, pickle.HIGHEST_PROTOCOL), user_id, expires_at))
+        self._writes += 1
+        if self._writes % 100 == 0:
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+
+    def delete(self, sid):
+        self._db.connection().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def delete_user(self, user_id):
+        return self._db.connection().execute("DELETE FROM sessions WHERE user_id = ?", (user_id,)).rowcount
+
+
+class ServerSession(SecureCookieSession):
+    """Session dict whose contents live in the store; the cookie only carries the id"""
+
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        super().__init__(initial)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.stale_sid = None  # id yang harus dihapus setelah regenerate()
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Flask session interface backed by a SessionStore with sliding expiry"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            record = self.store.load(sid, time.time())
+            if record is not None:
+                data, expires_at = record
+                return ServerSession(data, sid, expires_at)
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add('Cookie')
+        if session.stale_sid:
+            self.store.delete(session.stale_sid)
+
+        if not session:
+            # Session kosong (mis. setelah logout): hapus dari store, tidak perlu cookie
+            if session.sid is not None and (session.modified or session.stale_sid):
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        now = time.time()
+        lifetime = SESSION_CONFIG['lifetime']
+        touch = session.expires_at is None or session.expires_at - now < lifetime - SESSION_CONFIG['touch_interval']
+        if not (session.modified or touch or session.sid is None):
+            return
+        if session.sid is None:
+            session.sid = secrets.token_urlsafe(32)
+        session.expires_at = now + lifetime
+        self.store.save(session.sid, dict(session), session.get('user_id'), session.expires_at)
+        response.set_cookie(
+            name, session.sid, expires=int(session.expires_at), httponly=self.get_cookie_httponly(app),
+            domain=domain, path=path, secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app)
+        )
+
+
+store = MemorySessionStore()
+_user_loader = None
+
+
+def regenerate():
+    """Give the current session a new id (call on login to prevent session fixation)"""
+    if isinstance(session, ServerSession) and session.sid is not None:
+        session.stale_sid = session.sid
+        session.sid = None
+    session.modified = True
+
+
+def login(user):
+    """Start an authenticated session for user"""
+    regenerate()
+    session['user_id'] = user.id
+    session['nama'] = user.nama_lengkap
+    session['role'] = user.role
+    session['_identity_at'] = time.time()
+
+
+def revoke_user(user_id):
+    """Log a user out everywhere, e.g. after the account was deleted"""
+    return store.delete_user(user_id)
+
+
+def _refresh_identity():
+    # Nama & role di session adalah salinan baris users; dicek ulang berkala agar perubahan role berlaku
+    user_id = session.get('user_id')
+    if user_id is None or _user_loader is None:
+        return
+    now = time.time()
+    if now - session.get('_identity_at', 0) < SESSION_CONFIG['identity_ttl']:
+        return
+    user = _user_loader(user_id)
+    if user is None:
+        session.clear()
+        return
+    session['nama'] = user.nama_lengkap
+    session['role'] = user.role
+    session['_identity_at'] = now
+
+
+def init_app(app, user_loader=None):
+    """Install the server-side session interface (SESSION_STORE_BACKEND, SESSION_STORE_LIFETIME, ...)"""
+    global store, _user_loader
+    for key in SESSION_CONFIG:
+        config_key = f'SESSION_STORE_{key.upper()}'
+        if config_key in app.config:
+            SESSION_CONFIG[key] = app.config[config_key]
+    if SESSION_CONFIG['backend'] == 'sqlite':
+        path = db_sqlite.instance_file(app, SESSION_CONFIG['path'])
+        store = SQLiteSessionStore(path)
+    else:
+        store = MemorySessionStore()
+    _user_loader = user_loader
+    app.session_interface = ServerSideSessionInterface(store)
+    app.before_request(_refresh_identity)
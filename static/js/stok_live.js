@@ -0,0 +1,43 @@
+// Stok live untuk semua elemen [data-stok-event] di halaman:
+// event yang ditandai [data-stok-hot] lewat satu EventSource, sisanya polling /api/stok (bisa di-cache)
+(function () {
+    var script = document.currentScript;
+    var hot = [], cold = [];
+    document.querySelectorAll('[data-stok-event]').forEach(function (node) {
+        var id = node.getAttribute('data-stok-event');
+        var list = node.hasAttribute('data-stok-hot') ? hot : cold;
+        if (hot.indexOf(id) < 0 && cold.indexOf(id) < 0) list.push(id);
+    });
+
+    function apply(stock) {
+        Object.keys(stock).forEach(function (id) {
+            document.querySelectorAll('[data-stok-event="' + id + '"]').forEach(function (node) {
+                node.textContent = stock[id];
+            });
+            document.querySelectorAll('[data-stok-max="' + id + '"]').forEach(function (input) {
+                input.max = stock[id];
+                input.disabled = stock[id] < 1;
+            });
+        });
+    }
+
+    if (!window.EventSource) {
+        cold = cold.concat(hot);
+        hot = [];
+    }
+    if (hot.length) {
+        var source = new EventSource(script.getAttribute('data-stream') + '?ids=' + hot.join(','));
+        source.addEventListener('stok', function (message) {
+            apply(JSON.parse(message.data));
+        });
+    }
+    if (cold.length && window.fetch) {
+        var url = script.getAttribute('data-poll') + '?ids=' + cold.join(',');
+        setInterval(function () {
+            if (document.hidden) return;  // tab di belakang tidak perlu stok terbaru
+            fetch(url).then(function (response) {
+                return response.ok ? response.json() : {};
+            }).then(apply).catch(function () {});
+        }, parseInt(script.getAttribute('data-interval'), 10) || 15000);
+    }
+})();
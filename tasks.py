@@ -0,0 +1,51 @@
+from flask import render_template
+
+import cache
+import images
+import jobs
+import mailer
+from models import Transaction
+
+# Pekerjaan setelah pembelian; tambah nama task di sini agar ikut dijadwalkan untuk setiap transaksi
+POST_PURCHASE_TASKS = ('send_purchase_confirmation',)
+
+
+def after_purchase(transaction_id):
+    """Queue the post-purchase work for a committed transaction; one job per task and transaction"""
+    for name in POST_PURCHASE_TASKS:
+        jobs.enqueue(name, key=f'{name}:{transaction_id}', transaction_id=transaction_id)
+
+
+def process_poster_later(filename):
+    """Queue the variants of a saved event's poster; pages show the original until the job has run"""
+    if not filename:
+        return
+    try:
+        jobs.enqueue('process_poster', filename=filename)
+    except Exception as e:
+        # Event sudah tersimpan; varian bisa dibuat nanti dengan `flask images build`
+        print(f"Error queueing poster {filename}: {e}")
+
+
+@jobs.task('process_poster')
+def process_poster(filename):
+    """Build the card/detail JPEG + WebP variants of static/img/<filename>"""
+    if not images.pipeline.available:
+        return  # tanpa Pillow tidak ada yang bisa dicoba ulang; poster asli tetap dipakai
+    before = images.pipeline.version(filename)
+    if not images.pipeline.process(filename):
+        # Gagal render (atau file belum ada): biarkan antrean mencoba lagi dengan backoff
+        raise RuntimeError(f"varian poster {filename} gagal dibuat")
+    if images.pipeline.version(filename) != before:
+        # Halaman katalog yang di-cache masih memuat poster asli
+        cache.bump('events')
+
+
+@jobs.task('send_purchase_confirmation')
+def send_purchase_confirmation(transaction_id):
+    """Email the buyer their e-ticket details"""
+    trx = Transaction.get_details(transaction_id)
+    if trx is None or not trx['email_pemesan']:
+        return  # transaksi sudah dihapus atau tanpa email: tidak ada yang dikirim
+    body = render_template('email/konfirmasi_pembelian.txt', trx=trx)
+    mailer.send(trx['email_pemesan'], f"E-tiket FesTix #{trx['id']}: {trx['nama_event']}", body)
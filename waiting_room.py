@@ -0,0 +1,228 @@
+import math
+import threading
+import time
+from collections import deque
+
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+
+import db_sqlite
+
+# Konfigurasi Ruang Tunggu
+WAITING_ROOM_CONFIG = {
+    'enabled': False,
+    'events': None,         # None = semua event, atau kumpulan event_id yang memakai antrean
+    'backend': 'memory',    # 'memory' (per proses) atau 'sqlite' (dibagi antar worker)
+    'path': 'festix_waiting_room.sqlite3',
+    'rate': 5.0,            # pembeli yang diizinkan masuk per detik
+    'burst': 20,            # jumlah pembeli yang langsung masuk saat antrean kosong
+    'token_ttl': 600,       # detik berlaku token masuk ke checkout
+}
+
+
+def _advance(next_ticket, admitted, updated_at, now, rate, burst):
+    """Move the admission boundary forward by rate * elapsed, capped at issued tickets + burst"""
+    issued = next_ticket - 1
+    ceiling = max(admitted, issued + burst)
+    return min(admitted + max(0.0, now - updated_at) * rate, ceiling)
+
+
+class QueueBackend:
+    """Storage for queue counters; every method works on one room (event id)"""
+
+    def join(self, room, visitor, now, rate, burst):
+        """Return (ticket, admitted_upto) and give visitor a ticket if they do not hold one"""
+        raise NotImplementedError
+
+    def status(self, room, visitor, now, rate, burst):
+        """Return (ticket or None, admitted_upto)"""
+        raise NotImplementedError
+
+    def leave(self, room, visitor):
+        """Forget the visitor's ticket (after admission)"""
+        raise NotImplementedError
+
+    def stats(self, room, now, rate, burst):
+        """Return (issued, admitted_upto)"""
+        raise NotImplementedError
+
+
+class MemoryQueueBackend(QueueBackend):
+    """Queue state held in this process"""
+
+    def __init__(self):
+        self._rooms = {}    # room -> [next_ticket, admitted, updated_at]
+        self._tickets = {}  # (room, visitor) -> ticket
+        self._lock = threading.Lock()
+
+    def _room(self, room, now, rate, burst):
+        state = self._rooms.get(room)
+        if state is None:
+            state = self._rooms[room] = [1, float(burst), now]
+        state[1] = _advance(state[0], state[1], state[2], now, rate, burst)
+        state[2] = now
+        return state
+
+    def join(self, room, visitor, now, rate, burst):
+        with self._lock:
+            state = self._room(room, now, rate, burst)
+            ticket = self._tickets.get((room, visitor))
+            if ticket is None:
+                ticket = self._tickets[(room, visitor)] = state[0]
+                state[0] += 1
+            return ticket, state[1]
+
+    def status(self, room, visitor, now, rate, burst):
+        with self._lock:
+            state = self._room(room, now, rate, burst)
+            return self._tickets.get((room, visitor)), state[1]
+
+    def leave(self, room, visitor):
+        with self._lock:
+            self._tickets.pop((room, visitor), None)
+
+    def stats(self, room, now, rate, burst):
+        with self._lock:
+            state = self._room(room, now, rate, burst)
+            return state[0] - 1, state[1]
+
+
+class SQLiteQueueBackend(QueueBackend):
+    """Queue state in a local SQLite file so all workers on the box share one queue"""
+
+    def __init__(self, path):
+        self.path = path
+        self._db = db_sqlite.LocalDatabase(path)
+        conn = self._db.connection()
+        conn.execute("CREATE TABLE IF NOT EXISTS wr_rooms (room INTEGER PRIMARY KEY, next_ticket INTEGER, admitted REAL, updated_at REAL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS wr_tickets (room INTEGER, visitor TEXT, ticket INTEGER, PRIMARY KEY (room, visitor))")
+
+    def _room(self, conn, room, now, rate, burst):
+        row = conn.execute("SELECT next_ticket, admitted, updated_at FROM wr_rooms WHERE room = ?", (room,)).fetchone()
+        if row is None:
+            next_ticket, admitted = 1, float(burst)
+        else:
+            next_ticket, admitted = row[0], _advance(row[0], row[1], row[2], now, rate, burst)
+        return next_ticket, admitted
+
+    def _save(self, conn, room, next_ticket, admitted, now):
+        conn.execute("INSERT OR REPLACE INTO wr_rooms (room, next_ticket, admitted, updated_at) VALUES (?, ?, ?, ?)",
+                     (room, next_ticket, admitted, now))
+
+    def join(self, room, visitor, now, rate, burst):
+        conn = self._db.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            next_ticket, admitted = self._room(conn, room, now, rate, burst)
+            row = conn.execute("SELECT ticket FROM wr_tickets WHERE room = ? AND visitor = ?", (room, visitor)).fetchone()
+            if row is None:
+                ticket = next_ticket
+                conn.execute("INSERT INTO wr_tickets (room, visitor, ticket) VALUES (?, ?, ?)", (room, visitor, ticket))
+                next_ticket += 1
+            else:
+                ticket = row[0]
+            self._save(conn, room, next_ticket, admitted, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return ticket, admitted
+
+    def status(self, room, visitor, now, rate, burst):
+        conn = self._db.connection()
+        _, admitted = self._room(conn, room, now, rate, burst)
+        row = conn.execute("SELECT ticket FROM wr_tickets WHERE room = ? AND visitor = ?", (room, visitor)).fetchone()
+        return (row[0] if row else None), admitted
+
+    def leave(self, room, visitor):
+        self._db.connection().execute("DELETE FROM wr_tickets WHERE room = ? AND visitor = ?", (room, visitor))
+
+    def stats(self, room, now, rate, burst):
+        next_ticket, admitted = self._room(self._db.connection(), room, now, rate, burst)
+        return next_ticket - 1, admitted
+
+
+class WaitingRoom:
+    """Virtual queue in front of checkout.
+
+    Buyers take a numbered ticket; the admission boundary advances at `rate`
+    tickets per second, so the DB sees a steady flow instead of a thundering
+    herd. Admitted buyers receive a signed, time-limited admission token.
+    """
+
+    def __init__(self, backend=None, secret_key='', **config):
+        self.backend = backend or MemoryQueueBackend()
+        self.config = dict(WAITING_ROOM_CONFIG, **config)
+        self._serializer = URLSafeTimedSerializer(secret_key or 'festix', salt='festix-admission')
+        self._admissions = deque()  # timestamps of tokens issued by this process, for the rate metric
+        self._lock = threading.Lock()
+
+    def is_active(self, event_id):
+        events = self.config['events']
+        return self.config['enabled'] and (events is None or event_id in events)
+
+    def join(self, event_id, visitor):
+        """Enter the queue; returns a dict with position, eta and (if admitted) a token"""
+        ticket, admitted = self.backend.join(event_id, str(visitor), time.time(), self.config['rate'], self.config['burst'])
+        return self._describe(event_id, visitor, ticket, admitted)
+
+    def status(self, event_id, visitor):
+        ticket, admitted = self.backend.status(event_id, str(visitor), time.time(), self.config['rate'], self.config['burst'])
+        if ticket is None:
+            return None
+        return self._describe(event_id, visitor, ticket, admitted)
+
+    def _describe(self, event_id, visitor, ticket, admitted):
+        position = max(0, ticket - math.floor(admitted))
+        info = {'ticket': ticket, 'position': position, 'eta': math.ceil(position / self.config['rate']), 'token': None}
+        if position == 0:
+            info['token'] = self._serializer.dumps({'event_id': event_id, 'visitor': str(visitor)})
+            self.backend.leave(event_id, str(visitor))
+            with self._lock:
+                self._admissions.append(time.time())
+        return info
+
+    def check_token(self, token, event_id, visitor):
+        """True if token admits visitor to event_id and has not expired"""
+        if not token:
+            return False
+        try:
+            data = self._serializer.loads(token, max_age=self.config['token_ttl'])
+        except (BadSignature, SignatureExpired):
+            return False
+        return data.get('event_id') == event_id and data.get('visitor') == str(visitor)
+
+    def stats(self, event_id):
+        """Queue depth and admission rate for one event"""
+        issued, admitted = self.backend.stats(event_id, time.time(), self.config['rate'], self.config['burst'])
+        now = time.time()
+        with self._lock:
+            while self._admissions and self._admissions[0] < now - 60:
+                self._admissions.popleft()
+            admitted_last_minute = len(self._admissions)
+        return {
+            'event_id': event_id,
+            'issued': issued,
+            'depth': max(0, issued - math.floor(admitted)),
+            'admission_rate': self.config['rate'],
+            'admitted_last_minute': admitted_last_minute,
+        }
+
+
+room = WaitingRoom()
+
+
+def init_app(app):
+    """Configure the waiting room from app.config (WAITING_ROOM_ENABLED, WAITING_ROOM_RATE, ...)"""
+    global room
+    config = dict(WAITING_ROOM_CONFIG)
+    for key in config:
+        config_key = f'WAITING_ROOM_{key.upper()}'
+        if config_key in app.config:
+            config[key] = app.config[config_key]
+    backend_name, path = config.pop('backend'), config.pop('path')
+    if backend_name == 'sqlite':
+        path = db_sqlite.instance_file(app, path)
+        backend = SQLiteQueueBackend(path)
+    else:
+        backend = MemoryQueueBackend()
+    room = WaitingRoom(backend, app.secret_key, **config)